@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Reduce track points of many gpx files by using Douglas-Peucker N algorithm.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# The files are processed by reduce_points() of reduce_points*.py in a pool of
+# worker processes; each worker imports gpxpy once and processes many files.
+# Outputs are written to *_c.gpx as in reduce_points*.py.
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextlib
+import glob
+import importlib
+import io
+import os
+from pathlib import Path
+import sys
+import time
+
+MODULES = {
+    '2d': 'reduce_points',
+    '3d': 'reduce_points_3d',
+    '2dt': 'reduce_points_2dt',
+    }
+
+
+def find_gpx_files(pattern):
+    """List gpx files in a directory or matching a glob pattern, except for *_c.gpx (outputs)."""
+    path = Path(pattern)
+    if path.is_dir():
+        files = path.glob('*.gpx')
+    else:
+        files = (Path(x) for x in glob.glob(pattern, recursive=True))
+    return sorted(x for x in files if not x.name.endswith('_c.gpx'))
+
+
+def reduce_file(gpxdocs, num_points, mode='2d', epsilon=None):
+    """Run reduce_points() of the mode on a file.
+
+    Returns:
+        (gpxdocs, elapsed time in s, None or error message)
+    """
+    start_time = time.perf_counter()
+    try:
+        module = importlib.import_module(MODULES[mode])
+        with contextlib.redirect_stdout(io.StringIO()):
+            module.reduce_points(Path(gpxdocs), num_points, epsilon=epsilon)
+        error = None
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    return gpxdocs, time.perf_counter() - start_time, error
+
+
+def reduce_files(files, num_points, mode='2d', workers=None, epsilon=None):
+    """Reduce gpx files in a pool of processes.
+
+    Args:
+        files; paths of gpx files.
+        num_points; number of points in integer (for each segment)
+        mode; '2d', '3d' or '2dt'
+        workers; number of processes (os.cpu_count() if None)
+        epsilon (optional); error tolerance in meters.
+
+    Yields:
+        (gpxdocs, elapsed time in s, None or error message) in order of completion.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(reduce_file, str(x), num_points, mode, epsilon) for x in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Reduce gpx track points of many files by Douglas-Peucker N.')
+    parser.add_argument('input', help='a directory or a glob pattern of gpx files')
+    parser.add_argument('number_of_points', type=int, nargs='?', default=2000)
+    parser.add_argument('-m', '--mode', choices=sorted(MODULES), default='2d')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('-e', '--epsilon', type=float, default=None,
+        help='error tolerance in meters (number_of_points is the upper limit)')
+    args = parser.parse_args(argv)
+
+    files = find_gpx_files(args.input)
+    if not files:
+        print(f'Error: no gpx files in {args.input}.')
+        return 1
+
+    start_time = time.perf_counter()
+    failures = []
+    for gpxdocs, elapsed, error in reduce_files(
+            files, args.number_of_points, args.mode, args.workers, args.epsilon):
+        if error is None:
+            print(f'{gpxdocs}: {elapsed:.3f} s')
+        else:
+            print(f'{gpxdocs}: failed ({error})')
+            failures.append(gpxdocs)
+
+    print(f'Processed {len(files)} files ({len(failures)} failed) '
+        f'in {time.perf_counter() - start_time:.3f} s with {args.workers} workers.')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
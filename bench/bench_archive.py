@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the reduction of many tracks from gpx files vs. from a track archive.
+#
+# Usage: # python bench/bench_archive.py [number_of_files [number_of_points [target_points]]]
+#
+# Gpx files of synthetic tracks (random walk with elevation and time) are
+# written to a temporary directory and archived once by track_archive.  All
+# tracks are then reduced in each mode by parsing the files again
+# (gpx_stream.read_segments() and reduce_segments()) and from the archive
+# (TrackArchive.reduce()).  The kept indices should be identical.
+
+from datetime import datetime, timezone
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import gpx_stream
+import track_archive
+from synthetic import WORKLOADS
+
+
+def make_document(track):
+    """A gpx document in bytes of a track in one trkseg."""
+    start_time = datetime(2023, 5, 1, tzinfo=timezone.utc).timestamp()
+    trkpts = ''.join(
+        f'\n      <trkpt lat="{lat:.7f}" lon="{lon:.7f}"><ele>{ele:.1f}</ele>'
+        f'<time>{datetime.fromtimestamp(start_time + t, timezone.utc):%Y-%m-%dT%H:%M:%SZ}</time></trkpt>'
+        for lat, lon, ele, t in zip(
+            track['latitude'], track['longitude'], track['elevation'], track['time']))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="bench_archive">\n'
+        '  <trk>\n    <trkseg>'
+        f'{trkpts}\n    </trkseg>\n  </trk>\n</gpx>\n').encode()
+
+
+def reduce_files(files, target_points, mode):
+    kept = []
+    for gpxdocs in files:
+        segments = gpx_stream.read_segments(gpxdocs, mode)
+        flags = gpx_stream.reduce_segments(segments, target_points, mode)
+        kept += [track_archive.kept_indices(x) for x in flags]
+    return kept
+
+
+if __name__ == '__main__':
+    num_files = 20 if len(sys.argv) < 2 else int(sys.argv[1])
+    n = 50000 if len(sys.argv) < 3 else int(sys.argv[2])
+    target_points = 2000 if len(sys.argv) < 4 else int(sys.argv[3])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i in range(num_files):
+            files.append(Path(tmp, f'{i:04d}.gpx'))
+            files[-1].write_bytes(make_document(WORKLOADS['random_walk'](n, seed=i)))
+        archive_path = Path(tmp, 'tracks.dpn')
+        t = time.perf_counter()
+        track_archive.build_archive(archive_path, files)
+        print(f'{num_files} files of {n} points to {target_points}')
+        print(f'build archive: {time.perf_counter() - t:.3f} s '
+            f'({archive_path.stat().st_size / 1e6:.1f} MB)')
+
+        with track_archive.TrackArchive(archive_path) as archive:
+            for mode in ('2d', '3d', '2dt'):
+                t = time.perf_counter()
+                from_files = reduce_files(files, target_points, mode)
+                t_files = time.perf_counter() - t
+                t = time.perf_counter()
+                from_archive = archive.reduce(range(len(archive)), target_points, mode)
+                t_archive = time.perf_counter() - t
+                print(f'{mode:>3}: gpx files {t_files:.3f} s, archive {t_archive:.3f} s '
+                    f'(x{t_files / t_archive:.2f}), identical: {from_files == from_archive}',
+                    flush=True)
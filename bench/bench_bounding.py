@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the farthest point search with and without the bounding boxes.
+#
+# Usage: # python bench/bench_bounding.py [number_of_points [target_points]]
+#
+# find_farthest_bounded() (default with numpy) is compared with the plain
+# find_farthest_np() on the synthetic tracks, mostly worst cases for the
+# rescans of long spans; line_outliers, spiral and decay.
+# The flags should be identical.
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import douglas_peucker_n
+from projection import COLUMNS, PROJECTIONS
+from synthetic import WORKLOADS
+
+
+def set_bound_min_span(span):
+    """Set BOUND_MIN_SPAN of douglas_peucker_n (and of the compiled accelerator if used)."""
+    for module in (douglas_peucker_n, sys.modules.get('_douglas_peucker_n_accel')):
+        if module is not None:
+            module.BOUND_MIN_SPAN = span
+
+
+def run(pts, target_points, metric, bound_min_span):
+    set_bound_min_span(bound_min_span)
+    t = time.perf_counter()
+    flags = douglas_peucker_n.simplify(pts, target_points, metric)
+    return time.perf_counter() - t, flags
+
+
+if __name__ == '__main__':
+    n = 1000000 if len(sys.argv) < 2 else int(sys.argv[1])
+    target_points = 5000 if len(sys.argv) < 3 else int(sys.argv[2])
+    default = douglas_peucker_n.BOUND_MIN_SPAN
+
+    for name, generate in WORKLOADS.items():
+        track = generate(n)
+        for mode in ('2d', '3d'):
+            pts = PROJECTIONS[mode](*(track[x] for x in COLUMNS[mode]))
+            metric = douglas_peucker_n.MODES[mode].metric
+            t_plain, flags_plain = run(pts, target_points, metric, sys.maxsize)
+            t_bounded, flags_bounded = run(pts, target_points, metric, default)
+            print(f'{name:>15} {mode}; plain: {t_plain:.3f} s, bounded: {t_bounded:.3f} s '
+                f'(x{t_plain / t_bounded:.2f}), identical: {flags_plain == flags_bounded}', 
+                flush=True)
+    set_bound_min_span(default)
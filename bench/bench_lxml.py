@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the removal of the reduced points from an lxml tree.
+#
+# Usage: # python bench/bench_lxml.py [number_of_points [target_points]]
+#
+# A gpx document of synthetic track points (random walk) in one trkseg is
+# parsed by lxml twice, the flags are computed once, and the points are
+# removed by the previous loop of parent.remove() of lxml/lxml_test*.py and
+# by gpx_lxml.rebuild() (one bulk extend).  The documents should be identical.
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from lxml import etree
+import gpx_lxml
+from gpx_stream import reduce_columns
+from synthetic import WORKLOADS
+
+
+def make_document(n):
+    """A gpx document in bytes of n track points in one trkseg."""
+    track = WORKLOADS['random_walk'](n)
+    trkpts = ''.join(
+        f'\n      <trkpt lat="{lat:.7f}" lon="{lon:.7f}"><ele>{ele:.1f}</ele></trkpt>'
+        for lat, lon, ele in zip(track['latitude'], track['longitude'], track['elevation']))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="bench_lxml">\n'
+        '  <trk>\n    <name>synthetic</name>\n    <trkseg>'
+        f'{trkpts}\n    </trkseg>\n  </trk>\n</gpx>\n').encode()
+
+
+def remove_loop(parent, points, flags):
+    """The previous removal, one parent.remove() for each removed point."""
+    for point, flag in zip(points, flags):
+        if flag:
+            parent.remove(point)
+
+
+def run(remove, data, flags):
+    tree = etree.fromstring(data)
+    segments = gpx_lxml.find_segments(tree)
+    t = time.perf_counter()
+    remove(*segments.pop(), flags)
+    elapsed = time.perf_counter() - t
+    return elapsed, etree.tostring(tree)
+
+
+if __name__ == '__main__':
+    n = 1000000 if len(sys.argv) < 2 else int(sys.argv[1])
+    target_points = 2000 if len(sys.argv) < 3 else int(sys.argv[2])
+    data = make_document(n)
+
+    tree = etree.fromstring(data)
+    _, points = gpx_lxml.find_segments(tree)[0]
+    flags = reduce_columns([gpx_lxml.read_columns(points, '2d')], target_points, '2d')[0]
+    del tree, points
+
+    t_loop, loop = run(remove_loop, data, flags)
+    t_bulk, bulk = run(gpx_lxml.rebuild, data, flags)
+    print(f'{n} points to {target_points}')
+    print(f'remove loop: {t_loop:.3f} s')
+    print(f'    rebuild: {t_bulk:.3f} s (x{t_loop / t_bulk:.2f})')
+    print(f'identical: {loop == bulk}')
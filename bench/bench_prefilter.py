@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the radial distance prefilter before Douglas-Peucker N.
+#
+# Usage: # python bench/bench_prefilter.py [number_of_points [radius [target_points]]]
+#
+# Synthetic tracks with and without stops (jitter_clusters, random_walk) are
+# projected in each mode and reduced by reduce_points_n() without and with
+# the prefilter (radius in meters), by numpy and by the pure python code (on
+# a tenth of the points).  The prefiltered number of points and the times are reported.
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from projection import PROJECTIONS, COLUMNS
+from douglas_peucker_n import MODES, prefilter, radius_threshold, reduce_points_n
+from synthetic import WORKLOADS
+
+
+def run(pts, target_points, mode, use_numpy, radius):
+    t = time.perf_counter()
+    flags = reduce_points_n(pts, target_points, mode, flags_out=True, use_numpy=use_numpy, radius=radius)
+    return time.perf_counter() - t, flags
+
+
+if __name__ == '__main__':
+    n = 1000000 if len(sys.argv) < 2 else int(sys.argv[1])
+    radius = 5.0 if len(sys.argv) < 3 else float(sys.argv[2])
+    target_points = 2000 if len(sys.argv) < 4 else int(sys.argv[3])
+
+    print(f'{n} points (pure python {n // 10}) to {target_points}, radius {radius} m')
+    for name in ('jitter_clusters', 'random_walk'):
+        for use_numpy, size in ((True, n), (False, n // 10)):
+            track = WORKLOADS[name](size)
+            for mode in ('2d', '3d', '2dt'):
+                params = {'ave_speed': 'auto'} if mode == '2dt' else {}
+                pts = PROJECTIONS[mode](
+                    *[track[x] for x in COLUMNS[mode]], use_numpy=use_numpy, **params)
+                kept = prefilter(pts, radius_threshold(MODES[mode], [pts, ], radius),
+                    MODES[mode].timed, use_numpy)
+                t_plain, _ = run(pts, target_points, mode, use_numpy, None)
+                t_pre, _ = run(pts, target_points, mode, use_numpy, radius)
+                print(f'{name:>15} {"numpy" if use_numpy else "python":>6} {mode:>3}: '
+                    f'prefiltered to {len(kept)}, {t_plain:.3f} s -> {t_pre:.3f} s '
+                    f'(x{t_plain / t_pre:.2f})', flush=True)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+#
+# Micro-benchmark of the priority queues used in Douglas-Peucker N.
+#
+# Usage: # python bench/bench_queue.py [target_points ...]
+#
+# The access pattern is that of reduce_points2(); one dequeue followed by
+# two enqueues of (start, end, pos, dist) until target_points are dequeued.
+# Priorities include many ties to check that the selection is identical.
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from douglas_peucker_n import PriorityQueue, ArrayPriorityQueue
+
+
+def run(queue, target_points, seed=0):
+    rnd = random.Random(seed)
+    priorities = [rnd.choice((rnd.random(), 0.5, 0.0)) for _ in range(2 * target_points)]
+    order = []
+
+    t = time.perf_counter()
+    queue.enqueue(1.0, (0, 2 * target_points, 1, 1.0))
+    for k in range(target_points):
+        start, end, pos, _ = queue.dequeue()
+        order.append(pos)
+        p = priorities[2 * k]
+        queue.enqueue(p, (start, pos, 2 * k, p))
+        p = priorities[2 * k + 1]
+        queue.enqueue(p, (pos, end, 2 * k + 1, p))
+    return time.perf_counter() - t, order
+
+
+if __name__ == '__main__':
+    sizes = [int(x) for x in sys.argv[1:]] or [2000, 65535, 1000000]
+    for n in sizes:
+        t_dict, order_dict = run(PriorityQueue(), n)
+        t_array, order_array = run(ArrayPriorityQueue(n), n)
+        print(f'{n:>8} points; {PriorityQueue.name}: {t_dict:.3f} s, '
+            f'{ArrayPriorityQueue.name}: {t_array:.3f} s '
+            f'(x{t_dict / t_array:.2f}), identical: {order_dict == order_array}')
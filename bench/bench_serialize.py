@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the gpx serialization; gpx.to_xml() vs. gpx_writer.write_gpx().
+#
+# Usage: # python bench/bench_serialize.py [number_of_points [number_of_segments]]
+#
+# Gpxpy documents of synthetic track points (random walk with elevation and
+# time, without and with a trackpoint extension) are written to a temporary
+# file by the previous path of finalize_gpx() (to_xml() written through a text
+# file) and by write_gpx().  Wall time and peak memory (tracemalloc, measured
+# in another run) are reported; the files should be identical.
+
+from datetime import datetime, timedelta, timezone
+import filecmp
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import gpxpy.gpx
+from gpx_writer import save_gpx
+from synthetic import WORKLOADS
+
+EXTENSION_NS = 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
+
+
+def make_gpx(n, num_segments=1, extensions=False):
+    """A gpxpy document of n track points split into num_segments segments."""
+    track = WORKLOADS['random_walk'](n)
+    start_time = datetime(2023, 5, 1, tzinfo=timezone.utc)
+    gpx = gpxpy.gpx.GPX()
+    gpx.name = 'bench_serialize'
+    gpx.nsmap['gpxtpx'] = EXTENSION_NS
+    gpx_track = gpxpy.gpx.GPXTrack(name='synthetic')
+    gpx.tracks.append(gpx_track)
+    size = -(-n // num_segments)
+    for start in range(0, n, size):
+        segment = gpxpy.gpx.GPXTrackSegment()
+        for i in range(start, min(start + size, n)):
+            trkpt = gpxpy.gpx.GPXTrackPoint(
+                round(float(track['latitude'][i]), 7), round(float(track['longitude'][i]), 7),
+                elevation=round(float(track['elevation'][i]), 1),
+                time=start_time + timedelta(seconds=i))
+            if extensions:
+                extension = ET.Element(f'{{{EXTENSION_NS}}}TrackPointExtension')
+                ET.SubElement(extension, f'{{{EXTENSION_NS}}}hr').text = str(100 + i % 60)
+                trkpt.extensions.append(extension)
+            segment.points.append(trkpt)
+        gpx_track.segments.append(segment)
+    return gpx
+
+
+def to_xml_path(gpx, outfile_path):
+    """The previous finalize_gpx(); to_xml() written through a text file."""
+    result = gpx.to_xml('1.1')
+    with open(outfile_path, 'w', encoding='utf-8') as result_file:
+        result_file.write(result)
+
+
+def run(write, gpx, outfile_path):
+    t = time.perf_counter()
+    write(gpx, outfile_path)
+    elapsed = time.perf_counter() - t
+    tracemalloc.start()
+    write(gpx, outfile_path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    n = 200000 if len(sys.argv) < 2 else int(sys.argv[1])
+    num_segments = 1 if len(sys.argv) < 3 else int(sys.argv[2])
+
+    for extensions in (False, True):
+        gpx = make_gpx(n, num_segments, extensions)
+        with tempfile.TemporaryDirectory() as tmp:
+            a = Path(tmp, 'to_xml.gpx')
+            b = Path(tmp, 'write_gpx.gpx')
+            t_xml, peak_xml = run(to_xml_path, gpx, a)
+            t_stream, peak_stream = run(save_gpx, gpx, b)
+            print(f'{n} points{" with extensions" if extensions else ""} '
+                f'({a.stat().st_size / 1e6:.1f} MB)')
+            print(f'   to_xml: {t_xml:.3f} s, peak {peak_xml / 1e6:.1f} MB')
+            print(f'write_gpx: {t_stream:.3f} s, peak {peak_stream / 1e6:.1f} MB '
+                f'(x{t_xml / t_stream:.2f})')
+            print(f'identical: {filecmp.cmp(a, b, shallow=False)}', flush=True)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the search of long spans in threads for a very large single segment.
+#
+# Usage: # python bench/bench_threads.py [number_of_points [target_points [threads ...]]]
+#
+# A synthetic track (random walk, line with outliers) is projected in each
+# mode and reduced by reduce_points_n() with numpy, serially and with the
+# search of long spans split among threads (douglas_peucker_n.find_farthest_parallel()).
+# The flags should be identical; the speedup depends on the number of cores.
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from projection import PROJECTIONS, COLUMNS
+from douglas_peucker_n import reduce_points_n
+from synthetic import WORKLOADS
+
+
+def run(pts, target_points, mode, threads):
+    t = time.perf_counter()
+    flags = reduce_points_n(pts, target_points, mode, flags_out=True, threads=threads)
+    return time.perf_counter() - t, flags
+
+
+if __name__ == '__main__':
+    n = 5000000 if len(sys.argv) < 2 else int(sys.argv[1])
+    target_points = 2000 if len(sys.argv) < 3 else int(sys.argv[2])
+    thread_counts = [int(x) for x in sys.argv[3:]] or [2, 4]
+
+    print(f'{n} points to {target_points} ({os.cpu_count()} cpus)')
+    for name in ('random_walk', 'line_outliers'):
+        track = WORKLOADS[name](n)
+        for mode in ('2d', '3d', '2dt'):
+            params = {'ave_speed': 'auto'} if mode == '2dt' else {}
+            pts = PROJECTIONS[mode](*[track[x] for x in COLUMNS[mode]], **params)
+            t_serial, serial = run(pts, target_points, mode, None)
+            results = []
+            for threads in thread_counts:
+                t, flags = run(pts, target_points, mode, threads)
+                results.append(f'{threads} threads {t:.3f} s (x{t_serial / t:.2f}'
+                    f'{"" if flags == serial else ", DIFFERENT"})')
+            print(f'{name:>13} {mode:>3}: serial {t_serial:.3f} s, {", ".join(results)}', flush=True)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark suite of Douglas-Peucker N on synthetic tracks (requires numpy).
+#
+# Usage: # python bench/benchmark.py [-s 1000 10000 ...] [-g track.gpx ...] [-o result.json] [-b baseline.json]
+#
+# Each workload of bench/synthetic.py (and the longest segment of each real
+# track given by --gpx) is projected and reduced in the modes
+# (2d, 3d and 2dt) for each number of points; the time (best of --repeat),
+# points/s and the peak memory (by tracemalloc, in a separate run) are
+# reported, and written as JSON to track the performance from release to
+# release.  With --baseline, the deltas of the time from a previous result
+# are reported (positive for slower).
+
+import argparse
+from datetime import datetime, timezone
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import numpy as np
+import douglas_peucker_n
+from projection import COLUMNS, PROJECTIONS, average_speed
+from gpx_stream import read_segments
+from synthetic import WORKLOADS
+
+SIZES = [1000, 10000, 100000, 1000000]
+
+
+def gpx_track(gpxdocs):
+    """Columns of the longest segment in a gpx file, in the same form as synthetic.py
+
+    The time is left out if a point of the segment is without time (no 2dt).
+    """
+    segments = read_segments(gpxdocs, names=COLUMNS['3d'] + ('time',))
+    k = max(range(len(segments)), key=lambda i: len(segments[i]))
+    track = {name: np.asarray(column) for name, column in segments[k].columns.items()}
+    if np.isnan(track['time']).any():
+        del track['time']
+    else:
+        track['time'] -= track['time'][0]
+    return track
+
+
+def reduce_track(track, target_points, mode, params):
+    pts = PROJECTIONS[mode](*(track[x] for x in COLUMNS[mode]), **params)
+    return douglas_peucker_n.reduce_points_n(pts, target_points, mode)
+
+
+def measure(track, target_points, mode, repeat=3, memory=True):
+    """Time (best of repeat) and peak memory in bytes (or None) of reduce_track()"""
+    params = {}
+    if mode == '2dt':
+        params['ave_speed'] = average_speed(*(track[x] for x in COLUMNS[mode]))
+
+    seconds = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        reduce_track(track, target_points, mode, params)
+        seconds = min(seconds, time.perf_counter() - t)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        reduce_track(track, target_points, mode, params)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def key(result):
+    return (result['workload'], result['mode'], result['points'], result['target_points'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark of Douglas-Peucker N on synthetic tracks.')
+    parser.add_argument('-s', '--sizes', type=int, nargs='+', default=SIZES,
+        help='numbers of points (e.g. up to 10000000)')
+    parser.add_argument('-t', '--target-points', type=int, default=2000)
+    parser.add_argument('-w', '--workloads', nargs='+', choices=sorted(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument('-g', '--gpx', nargs='+', default=[], help='real tracks (gpx files) to add')
+    parser.add_argument('-m', '--modes', nargs='+', choices=sorted(COLUMNS), default=['2d', '3d', '2dt'])
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='skip the measurement of memory')
+    parser.add_argument('-o', '--output', help='write the results to a JSON file')
+    parser.add_argument('-b', '--baseline', help='a JSON file of previous results to compare with')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {key(x): x for x in json.load(f)['results']}
+
+    tracks = [(name, n, WORKLOADS[name]) for name in args.workloads for n in args.sizes]
+    tracks += [(Path(x).name, None, Path(x)) for x in args.gpx]
+
+    results = []
+    for name, n, source in tracks:
+        if n is None:
+            track = gpx_track(source)
+            n = len(track['latitude'])
+        else:
+            track = source(n)
+        target_points = min(args.target_points, n)
+        for mode in args.modes:
+            if not all(x in track for x in COLUMNS[mode]):
+                print(f'{name:>15} {mode:>3} {n:>9}; skipped, a point without time', flush=True)
+                continue
+            seconds, peak = measure(track, target_points, mode, args.repeat, not args.no_memory)
+            result = {
+                'workload': name,
+                'mode': mode,
+                'points': n,
+                'target_points': target_points,
+                'seconds': seconds,
+                'points_per_s': n / seconds,
+                'peak_bytes': peak,
+                }
+            line = (f'{name:>15} {mode:>3} {n:>9}; {seconds:.4f} s, '
+                f'{result["points_per_s"]:.3e} points/s')
+            if peak is not None:
+                line += f', peak {peak / 2 ** 20:.1f} MiB'
+            previous = baseline.get(key(result))
+            if previous is not None:
+                result['delta'] = seconds / previous['seconds'] - 1
+                line += f', {result["delta"]:+.1%}'
+            print(line, flush=True)
+            results.append(result)
+
+    if args.output:
+        meta = {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'numpy': np.__version__,
+            'accelerated': douglas_peucker_n.ACCELERATED,
+            }
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# Parity check and timing of the compiled accelerator (see setup_accel.py).
+#
+# Usage: # python bench/check_accel.py [number_of_points [target_points]]
+#
+# The flags of the compiled douglas_peucker_n are compared with those of the
+# pure python code (loaded from the source with DPN_PURE_PYTHON set) for all
+# the modes, with and without numpy, on a random walk track.
+
+import importlib.util
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import douglas_peucker_n as compiled
+from projection import PROJECTIONS
+
+os.environ['DPN_PURE_PYTHON'] = '1'
+spec = importlib.util.spec_from_file_location('douglas_peucker_n_pure', ROOT / 'douglas_peucker_n.py')
+pure = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pure)
+
+
+def random_walk(n, seed=0):
+    rnd = random.Random(seed)
+    lat, lng, ele, t = [35.0], [139.0], [100.0], [0.0]
+    for _ in range(n - 1):
+        lat.append(lat[-1] + rnd.gauss(0, 1e-4))
+        lng.append(lng[-1] + rnd.gauss(0, 1e-4))
+        ele.append(ele[-1] + rnd.gauss(0, 1.0))
+        t.append(t[-1] + rnd.choice((1.0, 1.0, 2.0, 5.0)))
+    return {'2d': (lat, lng), '3d': (lat, lng, ele), '2dt': (lat, lng, t)}
+
+
+if __name__ == '__main__':
+    n = 100000 if len(sys.argv) < 2 else int(sys.argv[1])
+    target_points = n // 10 if len(sys.argv) < 3 else int(sys.argv[2])
+    if not compiled.ACCELERATED:
+        print('The compiled accelerator is not built; python setup_accel.py build_ext --inplace')
+        sys.exit(1)
+
+    failures = 0
+    columns = random_walk(n)
+    for mode in ('2d', '3d', '2dt'):
+        pts = PROJECTIONS[mode](*columns[mode], use_numpy=False)
+        for use_numpy in (False, True):
+            times = []
+            results = []
+            for module in (pure, compiled):
+                t = time.perf_counter()
+                results.append(module.reduce_points_n(
+                    pts, target_points, mode, flags_out=True, use_numpy=use_numpy))
+                times.append(time.perf_counter() - t)
+            identical = results[0] == results[1]
+            failures += not identical
+            print(f'{mode:>3} use_numpy={use_numpy!s:5}; pure: {times[0]:.3f} s, '
+                f'compiled: {times[1]:.3f} s (x{times[0] / times[1]:.2f}), identical: {identical}')
+    sys.exit(1 if failures else 0)
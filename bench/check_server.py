@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Regression check of the gpx responses of server.py (POST /simplify).
+#
+# Usage: # python bench/check_server.py
+#
+# A server of one worker is started on a unix socket in a temporary directory,
+# and the documents of check_stream.py (self-closing trkpts, trkpts with
+# children, mixed, with LF and CRLF line breaks) are posted in the modes.
+# The response should be 200, well-formed, the same as reduce_gpx_data(), and
+# have as many trkpts as reported by the X-Points header.  A chunked request
+# (without Content-Length) should be refused by 411 and its connection closed.
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from xml.parsers import expat
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from gpx_stream import reduce_gpx_data
+from server import SimplifyServer
+from check_stream import NS, make_document
+
+
+async def post(path, target, data):
+    """POST data to target on the unix socket; returns (status, headers, body)."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write(
+        f'POST {target} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/gpx+xml\r\n'
+        f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'.encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()).strip():
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return status, headers, body
+
+
+async def post_chunked(path, data):
+    """POST data chunked on a keep-alive connection; returns (status, closed)."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write(
+        b'POST /simplify HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/gpx+xml\r\n'
+        b'Transfer-Encoding: chunked\r\n\r\n'
+        + f'{len(data):x}\r\n'.encode() + data + b'\r\n0\r\n\r\n')
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()).strip():
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers['content-length']))
+    closed = await asyncio.wait_for(reader.read(1), 5) == b''
+    writer.close()
+    return status, closed
+
+
+def check(status, headers, body, data, num_points, mode):
+    """Errors (list of str) in the response to data."""
+    if status != 200:
+        return [f'status {status}: {body.decode(errors="replace").strip()}']
+    try:
+        expat.ParserCreate().Parse(body, True)
+    except expat.ExpatError as e:
+        return [f'not well-formed: {e}']
+    errors = []
+    if body != reduce_gpx_data(data, num_points, mode)[0]:
+        errors.append('not the same as reduce_gpx_data()')
+    before, after = (int(x) for x in headers['x-points'].split('->'))
+    if before != len(ET.fromstring(data).findall(f'.//{NS}trkpt')):
+        errors.append(f'X-Points of {before} points in the request')
+    if after != len(ET.fromstring(body).findall(f'.//{NS}trkpt')):
+        errors.append(f'X-Points of {after} points in the response')
+    return errors
+
+
+async def run(path):
+    server = asyncio.create_task(SimplifyServer(workers=1).serve(unix=path))
+    while not Path(path).exists():
+        if server.done():
+            server.result()
+        await asyncio.sleep(0.05)
+
+    failures = 0
+    try:
+        for style in ('empty', 'children', 'mixed'):
+            for newline in ('\n', '\r\n'):
+                data = make_document(40, style, newline)
+                for mode in ('2d', '3d', '2dt'):
+                    if mode == '2dt' and style != 'children':
+                        continue
+                    for num_points in (3, 10, 100):
+                        response = await post(path, f'/simplify?n={num_points}&mode={mode}', data)
+                        errors = check(*response, data, num_points, mode)
+                        failures += bool(errors)
+                        print(f'{style:>8} {newline!r:>6} {mode:>3} {num_points:>3}: '
+                            f'{"; ".join(errors) or "ok"}', flush=True)
+        status, closed = await post_chunked(path, make_document(40, 'children', '\n'))
+        errors = [f'status {status}'] if status != 411 else []
+        if not closed:
+            errors.append('connection kept alive with the body unread')
+        failures += bool(errors)
+        print(f' chunked: {"; ".join(errors) or "ok"}', flush=True)
+    finally:
+        server.cancel()
+    return failures
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = asyncio.run(run(str(Path(tmp, 'server.sock'))))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# Regression check of gpx_stream.reduce_gpx_data() on the byte ranges of trkpts.
+#
+# Usage: # python bench/check_stream.py
+#
+# Gpx documents with self-closing trkpts (<trkpt .../>), trkpts with children
+# and end tags with spaces (</trkpt >), mixed, with LF and CRLF line breaks,
+# are reduced in the modes.  The output should be well-formed, contain exactly
+# the kept trkpts (the same attributes and children as in the input) and
+# everything else of the input as is.
+
+import io
+import sys
+from pathlib import Path
+from xml.parsers import expat
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from gpx_stream import read_segments, reduce_gpx_data, reduce_segments
+
+NS = '{http://www.topografix.com/GPX/1/1}'
+
+
+def make_document(n, style, newline):
+    """A gpx document of n trkpts in two trksegs; style is 'empty', 'children' or 'mixed'."""
+    trkpts = []
+    for i in range(n):
+        lat, lon = 35 + (i * i % 7) * 1e-3, 139 + i * 1e-3
+        empty = style == 'empty' or (style == 'mixed' and i % 2)
+        if empty:
+            trkpts.append(f'  <trkpt lat="{lat:.4f}" lon="{lon:.4f}"/>')
+        else:
+            trkpts.append(
+                f'  <trkpt lat="{lat:.4f}" lon="{lon:.4f}">{newline}    <ele>{i % 50}</ele>{newline}'
+                f'    <time>2023-05-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z</time>{newline}  </trkpt >')
+    half = n // 2
+    return newline.join([
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="check_stream">',
+        '<trk><name>check</name><trkseg>', *trkpts[:half], '</trkseg>',
+        '<trkseg>', *trkpts[half:], '</trkseg></trk>',
+        '</gpx>', '']).encode()
+
+
+def check(data, num_points, mode):
+    """Errors (list of str) in the reduction of data."""
+    errors = []
+    try:
+        out, counts = reduce_gpx_data(data, num_points, mode)
+    except ValueError as e:
+        return [f'ValueError: {e}']
+    try:
+        expat.ParserCreate().Parse(out, True)
+    except expat.ExpatError as e:
+        return [f'not well-formed: {e}']
+
+    source = ET.fromstring(data)
+    result = ET.fromstring(out)
+    flags = reduce_segments(read_segments(io.BytesIO(data), mode), num_points, mode)
+    for k, (seg_in, seg_out, seg_flags) in enumerate(zip(
+            source.iter(f'{NS}trkseg'), result.iter(f'{NS}trkseg'), flags)):
+        kept = [ET.tostring(x) for x, flag in zip(seg_in.findall(f'{NS}trkpt'), seg_flags) if not flag]
+        if kept != [ET.tostring(x) for x in seg_out.findall(f'{NS}trkpt')]:
+            errors.append(f'segment {k}: the trkpts in the output are not the kept ones')
+        if counts[k][1] != len(kept):
+            errors.append(f'segment {k}: reported {counts[k][1]} points, {len(kept)} kept')
+    if len(list(result.iter(f'{NS}trkseg'))) != len(flags):
+        errors.append('the number of trksegs changed')
+    if result.find(f'{NS}trk/{NS}name') is None:
+        errors.append('the name of the trk is lost')
+    return errors
+
+
+if __name__ == '__main__':
+    failures = 0
+    for style in ('empty', 'children', 'mixed'):
+        for newline in ('\n', '\r\n'):
+            data = make_document(40, style, newline)
+            for mode in ('2d', '3d', '2dt'):
+                if mode == '2dt' and style != 'children':
+                    continue
+                for num_points in (3, 10, 100):
+                    errors = check(data, num_points, mode)
+                    failures += bool(errors)
+                    print(f'{style:>8} {newline!r:>6} {mode:>3} {num_points:>3}: '
+                        f'{"; ".join(errors) or "ok"}')
+    sys.exit(1 if failures else 0)
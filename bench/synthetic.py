@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Reproducible synthetic tracks for the benchmarks (requires numpy).
+#
+# Each generator returns a dict of columns (float64 numpy arrays) of latitude,
+# longitude (in decimal degrees), elevation (in meters) and time (in seconds),
+# around 35N 139E with a sampling interval of 1 s.
+
+import numpy as np
+
+LAT, LNG = 35.0, 139.0
+DEG = 1 / 111319 # 1 m in degrees of latitude, approximately.
+
+
+def _track(lat, lng, ele, rng):
+    n = len(lat)
+    return {
+        'latitude': lat,
+        'longitude': lng,
+        'elevation': ele,
+        'time': np.cumsum(rng.choice((1.0, 1.0, 1.0, 2.0, 5.0), n)) - 1.0,
+        }
+
+
+def random_walk(n, seed=0):
+    """A random walk with steps of about 10 m."""
+    rng = np.random.default_rng(seed)
+    return _track(
+        LAT + np.cumsum(rng.normal(0, 10 * DEG, n)),
+        LNG + np.cumsum(rng.normal(0, 10 * DEG, n)),
+        100 + np.cumsum(rng.normal(0, 1, n)),
+        rng)
+
+
+def line_outliers(n, seed=0, outliers=20):
+    """A straight road with GPS noise of 0.1 m and a few outliers of decaying size."""
+    rng = np.random.default_rng(seed)
+    s = np.arange(n) * 20 * DEG
+    lat = LAT + s + rng.normal(0, 0.1 * DEG, n)
+    lng = LNG + s + rng.normal(0, 0.1 * DEG, n)
+    i = rng.integers(0, n, outliers)
+    lat[i] += 1000 * DEG * 0.7 ** np.arange(outliers)
+    return _track(lat, lng, 100 + 0.01 * np.arange(n) % 50, rng)
+
+
+def spiral(n, seed=0, turns=50):
+    """A logarithmic spiral inwards; most spans are split near one of their ends."""
+    rng = np.random.default_rng(seed)
+    theta = np.linspace(0, 2 * np.pi * turns, n)
+    r = 5000 * DEG * np.exp(-8 * theta / theta[-1])
+    return _track(LAT + r * np.sin(theta), LNG + r * np.cos(theta), 100 + r / DEG / 100, rng)
+
+
+def jitter_clusters(n, seed=0, stop=500):
+    """Moves of 10 m/s alternating with stops of stop points jittering by 3 m."""
+    rng = np.random.default_rng(seed)
+    moving = (np.arange(n) // stop) % 2 == 0
+    steps = np.where(moving, 10 * DEG, 0.0)
+    jitter = np.where(moving, 0.5, 3.0) * DEG
+    return _track(
+        LAT + np.cumsum(steps) + rng.normal(0, 1, n) * jitter,
+        LNG + np.cumsum(steps * 0.5) + rng.normal(0, 1, n) * jitter,
+        100 + rng.normal(0, 2, n),
+        rng)
+
+
+def decay(n, seed=0):
+    """A straight road drifting away with an exponentially decaying offset."""
+    rng = np.random.default_rng(seed)
+    s = np.arange(n) * 10 * DEG
+    return _track(LAT + 1000 * DEG * np.exp(-np.arange(n) / (n / 20)), LNG + s, np.full(n, 100.0), rng)
+
+
+WORKLOADS = {
+    'random_walk': random_walk,
+    'line_outliers': line_outliers,
+    'spiral': spiral,
+    'jitter_clusters': jitter_clusters,
+    'decay': decay,
+    }
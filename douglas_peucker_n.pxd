@@ -0,0 +1,24 @@
+# Type declarations for the compiled accelerator of douglas_peucker_n.py
+# (see setup_accel.py); not used by the pure python code.
+
+import cython
+
+@cython.locals(ab2=cython.double, t=cython.double, x=cython.double, y=cython.double)
+cpdef double segment_point_distance(
+    double ax, double ay, double bx, double by, double px, double py)
+
+@cython.locals(ab2=cython.double, t=cython.double, x=cython.double, y=cython.double, z=cython.double)
+cpdef double segment_point_distance3d(
+    double ax, double ay, double az, double bx, double by, double bz,
+    double px, double py, double pz)
+
+@cython.locals(ax=cython.double, ay=cython.double, bx=cython.double, by=cython.double,
+    px=cython.double, py=cython.double, d=cython.double, m=cython.double,
+    i=cython.Py_ssize_t, c=cython.Py_ssize_t)
+cpdef tuple _find_farthest2d(xs, ys, Py_ssize_t start, Py_ssize_t end)
+
+@cython.locals(ax=cython.double, ay=cython.double, az=cython.double,
+    bx=cython.double, by=cython.double, bz=cython.double,
+    px=cython.double, py=cython.double, pz=cython.double, d=cython.double, m=cython.double,
+    i=cython.Py_ssize_t, c=cython.Py_ssize_t)
+cpdef tuple _find_farthest3d(xs, ys, zs, Py_ssize_t start, Py_ssize_t end)
@@ -0,0 +1,1038 @@
+# -*- coding: utf-8 -*-
+#
+# May 2023, a quick python port by ekspla.  https://github.com/ekspla/Douglas-Peucker_N
+#
+# Douglas-Peucker N algorithm shared by reduce_points*.py.
+# (https://psimpl.sourceforge.net/douglas-peucker.html)
+#
+# Original version written in JavaScript by 330k.  https://github.com/330k/gpx_tools
+# (c) 2014-2023 Kei Misawa, MIT License.
+
+from array import array
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import math
+import os
+import sys
+import projection
+from projection import ProjectedPoints
+from stats import phase
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Spans shorter than this are scanned in pure python even with numpy.
+NUMPY_MIN_SPAN = 64
+# Number of points in a block with a bounding box, see BoundedColumns.
+BOUND_BLOCK = 256
+# Spans shorter than this are scanned as a whole even with the bounding boxes.
+BOUND_MIN_SPAN = 16 * BOUND_BLOCK
+# Spans shorter than this are scanned in one thread even with threads.
+PARALLEL_MIN_SPAN = 64 * BOUND_MIN_SPAN
+# Offsets to the next point out of the radius searched at once by the prefilter with numpy.
+PREFILTER_RUN = 16
+# Points compared by the offsets (per point), and the fraction of the points left by them
+# above which the prefilter falls back to pure python.
+PREFILTER_WORK = 4
+PREFILTER_LEFT = 0.25
+
+
+def segment_point_distance(ax, ay, bx, by, px, py):
+    ab2 = (ax - bx) * (ax - bx) + (ay - by) * (ay - by)
+    t = ((ax - bx) * (ax - px) + (ay - by) * (ay - py)) / ab2 if ab2 else 0
+
+    if t > 1:
+        t = 1
+    elif t > 0:
+        pass
+    else:
+        # // includes A == B
+        t = 0
+
+    x = ax - t * (ax - bx)
+    y = ay - t * (ay - by)
+
+    return math.hypot(x - px, y - py)
+
+
+def segment_point_distance3d(ax, ay, az, bx, by, bz, px, py, pz):
+    """Squared distance, actually"""
+    ab2 = (ax - bx) * (ax - bx) + (ay - by) * (ay - by) + (az - bz) * (az - bz)
+    t = ((ax - bx) * (ax - px) + (ay - by) * (ay - py) + (az - bz) * (az - pz)) / ab2 if ab2 else 0
+
+    if t > 1:
+        t = 1
+    elif t > 0:
+        pass
+    else:
+        # // includes A == B
+        t = 0
+
+    x = ax - t * (ax - bx)
+    y = ay - t * (ay - by)
+    z = az - t * (az - bz)
+
+    #return math.hypot(x - px, y - py, z - pz) # for Python version => 3.8
+    return (x - px) * (x - px) + (y - py) * (y - py) + (z - pz) * (z - pz)
+
+
+# Distance kernels; squared is True if distance() returns the squared distance.
+Metric = namedtuple('Metric', 'name, distance, squared')
+EUCLIDEAN = Metric('euclidean', segment_point_distance, False)
+SQUARED = Metric('squared euclidean', segment_point_distance3d, True)
+
+# Projections of track points with their distance kernels, (optional)
+# conversions of distances in meters to the projected ones, and whether the
+# last axis is time.
+Mode = namedtuple('Mode', 'projection, metric, tolerance, timed', defaults=(None, False))
+MODES = {
+    '2d': Mode(projection.mercator_trkpts, EUCLIDEAN, projection.mercator_tolerance),
+    '3d': Mode(projection.ecef_trkpts, SQUARED, projection.ecef_tolerance),
+    '2dt': Mode(projection.mercator_time_trkpts, SQUARED, projection.mercator_time_tolerance, True),
+    }
+
+
+def reduce_points_n(trkpts, target_points, mode, flags_out=False, 
+        use_numpy=True, compact_queue=True, epsilon=None, stats=None, radius=None, threads=None, 
+        **params):
+    """Reduce gpx track points using Douglas-Peucker N
+
+    Args:
+        trkpts; an iterable object containing track points,
+            or ProjectedPoints (already projected by the mode).
+        target_points; number of points in integer (or None for no limit)
+        mode; '2d', '3d', '2dt' (see MODES) or Mode(projection, metric[, tolerance]).
+        flags_out; True/False output flags if True.
+        use_numpy; use the vectorized find_farthest_np() if numpy is available.
+        compact_queue; use ArrayPriorityQueue instead of PriorityQueue.
+        epsilon (optional); error tolerance in meters.  Stop adding points when
+            none of the removed points is farther than epsilon from the reduced track.
+        stats (optional); stats.Stats to be filled in ('projection' and 'reduce').
+        radius (optional); prefilter radius in meters (see prefilter()).  The
+            points within radius of the last kept point are removed before
+            the queue; the error may be up to epsilon plus radius.
+        threads (optional); number of threads to search long spans (see
+            simplify_segments()), with the same flags as without.
+        params; keyword arguments to the projection, e.g. ave_speed.
+
+    Returns:
+        a list of track points if flags_out is False; reduced_points
+        (indices of the reduced points if trkpts is ProjectedPoints)
+        else flags; a list of True/False flags
+    """
+    if isinstance(mode, str):
+        mode = MODES[mode]
+
+    if isinstance(trkpts, ProjectedPoints):
+        pts = trkpts
+    else:
+        with phase(stats, 'projection'):
+            pts = mode.projection(trkpts, **params)
+    with phase(stats, 'reduce'):
+        flags = simplify(pts, target_points, mode.metric, 
+            use_numpy=use_numpy, compact_queue=compact_queue, 
+            tolerance=epsilon_threshold(mode, [pts, ], epsilon), stats=stats, 
+            radius=radius_threshold(mode, [pts, ], radius), timed=mode.timed, threads=threads)
+
+    if flags_out:
+        return flags
+    elif isinstance(trkpts, ProjectedPoints):
+        return [i for i, flag in enumerate(flags) if not flag]
+    else:
+        reduced_points = [trkpt for trkpt, flag in zip(trkpts, flags) if not flag]
+        return reduced_points
+
+
+def epsilon_threshold(mode, segments, epsilon):
+    """Error tolerance in meters to the threshold of simplify() in the mode
+
+    The threshold is compared with the distance of the metric (squared if so).
+    The smallest one among the segments is used.
+
+    Args:
+        mode; Mode with the tolerance.
+        segments; a list of ProjectedPoints
+        epsilon; distance in meters (or None).
+
+    Returns:
+        the threshold, or None if epsilon is None.
+    """
+    if epsilon is None:
+        return None
+    threshold = radius_threshold(mode, segments, epsilon)
+    return threshold * threshold if mode.metric.squared else threshold
+
+
+def radius_threshold(mode, segments, radius):
+    """Distance in meters to that in the projected space of the mode (not squared)
+
+    The smallest one among the segments is used.
+
+    Returns:
+        the distance, or None if radius is None.
+    """
+    if radius is None:
+        return None
+    if mode.tolerance is None:
+        raise ValueError('No tolerance in the mode for a distance in meters')
+    return min((mode.tolerance(x, radius) for x in segments if len(x)), default=radius)
+
+
+def simplify(pts, target_points, metric=EUCLIDEAN, use_numpy=True, compact_queue=True, 
+        tolerance=None, stats=None, radius=None, timed=False, threads=None):
+    """Douglas-Peucker N on projected points
+
+    Args:
+        pts; ProjectedPoints
+        target_points; number of points in integer (or None for no limit)
+        metric; Metric, the distance kernel.
+        use_numpy; use the vectorized find_farthest_np() if numpy is available.
+        compact_queue; use ArrayPriorityQueue instead of PriorityQueue.
+        tolerance (optional); stop when the farthest distance is not larger
+            than this, in the projected space (squared if so is the metric).
+        stats (optional); stats.Stats to count the searches and the queue operations.
+        radius, timed, threads (optional); see simplify_segments().
+
+    Returns:
+        flags; a list of True/False flags (False for the reduced points)
+    """
+    return simplify_segments([pts, ], target_points, metric, 
+        use_numpy=use_numpy, compact_queue=compact_queue, tolerance=tolerance, stats=stats, 
+        radius=radius, timed=timed, threads=threads)[0]
+
+
+def simplify_segments(segments, target_points, metric=EUCLIDEAN, use_numpy=True, compact_queue=True, 
+        tolerance=None, stats=None, radius=None, timed=False, threads=None, executor=None):
+    """Douglas-Peucker N on segments of projected points with a shared queue
+
+    The most significant points among all the segments are selected until
+    target_points remain in total, or until the farthest distance of the
+    remaining points is not larger than tolerance.  Both ends of each segment are kept.
+
+    Args:
+        segments; a list of ProjectedPoints
+        target_points; number of points in integer (in total, or None for no limit)
+        metric; Metric, the distance kernel.
+        use_numpy; use the vectorized find_farthest_np() if numpy is available.
+        compact_queue; use ArrayPriorityQueue instead of PriorityQueue.
+        tolerance (optional); threshold of the distance (see simplify()).
+        stats (optional); stats.Stats to count the searches and the queue operations.
+        radius (optional); remove the points within radius (in the projected
+            space, not squared) of the last kept point before the queue, see prefilter().
+        timed; the last axis is time, see prefilter().
+        threads (optional); split the search of long spans among threads
+            (with numpy, see find_farthest_parallel()).  The flags are the same.
+        executor (optional); ThreadPoolExecutor used instead of a new one of threads.
+
+    Returns:
+        a list of flags for each segment; True/False flags (False for the reduced points)
+    """
+    if radius is not None:
+        kept = [prefilter(x, radius, timed, use_numpy) for x in segments]
+        flags = simplify_segments([take(x, y, use_numpy) for x, y in zip(segments, kept)], target_points, 
+            metric, use_numpy, compact_queue, tolerance, stats, threads=threads, executor=executor)
+        return [expand_flags(x, y, len(z)) for x, y, z in zip(flags, kept, segments)]
+
+    if threads and executor is None and use_numpy and np is not None:
+        with ThreadPoolExecutor(threads) as executor:
+            return simplify_segments(segments, target_points, metric, use_numpy, compact_queue, 
+                tolerance, stats, threads=threads, executor=executor)
+
+    count = 0
+    flags = [[True, ] * len(x) for x in segments]
+    if target_points is None:
+        target_points = sum(map(len, flags))
+    if tolerance is None:
+        tolerance = -math.inf
+    if compact_queue:
+        queue = ArrayPriorityQueue(min(target_points, sum(map(len, flags))))
+    else:
+        queue = PriorityQueue()
+
+    if use_numpy and np is not None:
+        segments = [bounded_columns(x) for x in segments]
+        find = find_farthest_bounded
+        if threads and executor is not None:
+            find = functools.partial(find_farthest_parallel, executor=executor, threads=threads)
+    else:
+        segments = [x.columns for x in segments]
+        find = find_farthest
+
+    if stats is not None:
+        find = stats.counting_find(find)
+        queue = stats.counting_queue(queue)
+
+    for k, (pts, seg_flags) in enumerate(zip(segments, flags)):
+        if not seg_flags:
+            continue
+        seg_flags[0] = seg_flags[-1] = False
+        count += min(len(seg_flags), 2)
+        if len(seg_flags) > 2:
+            farthest = find(pts, 0, len(seg_flags) - 1, metric)
+            queue.enqueue(farthest[3], (k, ) + farthest)
+
+    while queue.size() and (count < target_points):
+        k, start, end, pos, dist = queue.dequeue()
+        if dist <= tolerance:
+            break
+        flags[k][pos] = False
+        count += 1
+
+        if (start + 2 <= pos):
+            farthest = find(segments[k], start, pos, metric)
+            queue.enqueue(farthest[3], (k, ) + farthest)
+
+        if (pos + 2 <= end):
+            farthest = find(segments[k], pos, end, metric)
+            queue.enqueue(farthest[3], (k, ) + farthest)
+
+    return flags
+
+
+def prefilter(pts, radius, timed=False, use_numpy=True):
+    """Radial distance prefilter of projected points in linear time
+
+    A point is kept if it is farther than radius from the last kept point;
+    both ends are kept.  If timed, the distance is in the spatial axes only
+    (but the last one) and the last point before leaving each cluster is kept
+    too, so that the stationary points collapse to the start and the end of the stay.
+
+    Args:
+        pts; ProjectedPoints
+        radius; distance in the projected space (not squared).
+        timed; the last axis is time.
+        use_numpy; use _prefilter_np() if numpy is available.  The results
+            may differ from those of the pure python code at ties in the last bit.
+
+    Returns:
+        array('q') of the indices of the kept points in ascending order.
+    """
+    if use_numpy and np is not None and len(pts) > 2:
+        columns = pts.numpy_columns()
+        kept = _prefilter_np(columns[:-1] if timed else columns, radius, timed)
+        if kept is not None:
+            return array('q', kept.tobytes())
+
+    columns = pts.columns[:-1] if timed else pts.columns
+    kept = array('q')
+    if not len(pts):
+        return kept
+    points = zip(*[x.tolist() for x in columns])
+    anchor = next(points)
+    kept.append(0)
+    dist = math.dist
+    for i, p in enumerate(points, 1):
+        if dist(p, anchor) > radius:
+            if timed and kept[-1] != i - 1:
+                kept.append(i - 1)
+            kept.append(i)
+            anchor = p
+    if kept[-1] != len(pts) - 1:
+        kept.append(len(pts) - 1)
+    return kept
+
+
+def _prefilter_np(columns, radius, timed):
+    """prefilter() of numpy columns, or None if most of the points are within radius of the next ones
+
+    The next point farther than radius from each point is searched at once
+    for all the points by numpy, offset by offset up to PREFILTER_RUN (or
+    PREFILTER_WORK comparisons per point).  The kept points are then followed
+    from the first one; a run of points whose next ones are their neighbors
+    is kept as a whole, and only the other kept points are visited one by
+    one, by _next_out_np() if their next ones are not found yet.  If more
+    than PREFILTER_LEFT of the points are not found (and few are found by
+    the last offset), the pure python scan of prefilter() is faster and
+    None is returned.
+    """
+    n = len(columns[0])
+    r2 = radius * radius
+    following = np.full(n, -1, dtype=np.int64) # -1 if not found within offset
+    following[-1] = n
+    todo = np.arange(n - 1)
+    base = [col[:-1] for col in columns] # the coordinates of todo
+    work = 0
+    for offset in range(1, PREFILTER_RUN + 1):
+        if todo[-1] >= n - offset:
+            ends = todo >= n - offset
+            following[todo[ends]] = n
+            todo = todo[~ends]
+            base = [x[~ends] for x in base]
+            if not len(todo):
+                break
+        over = sum((col[todo + offset] - x) ** 2 for col, x in zip(columns, base)) > r2
+        following[todo[over]] = todo[over] + offset
+        todo = todo[~over]
+        base = [x[~over] for x in base]
+        work += len(over)
+        if len(todo) > n * PREFILTER_LEFT and len(todo) * 8 > len(over) * 7:
+            return None # Few found, e.g. with a radius of many steps.
+        if not len(todo) or work + len(todo) > PREFILTER_WORK * n:
+            break
+    if len(todo) > n * PREFILTER_LEFT:
+        return None
+
+    # The first point at or after each point whose next one is not the neighbor (n if none).
+    index = np.arange(n)
+    first = np.where(following != index + 1, index, n)
+    first = np.minimum.accumulate(first[::-1])[::-1]
+    starts, stops, extra = [], [], []
+    a = 0
+    while True:
+        starts.append(a)
+        f = int(first[a])
+        if f == n:
+            stops.append(n - 1)
+            break
+        stops.append(f) # The points from a to f are kept.
+        b = int(following[f])
+        if b < 0:
+            b = _next_out_np(columns, f, f + offset + 1, r2)
+        if b >= n:
+            break
+        if timed and b - 1 != f:
+            extra.append(b - 1)
+        a = b
+
+    runs = np.zeros(n + 1, dtype=np.int8)
+    runs[starts] = 1
+    runs[np.add(stops, 1)] -= 1
+    keep = np.cumsum(runs[:n], dtype=np.int8).astype(bool)
+    keep[extra] = True
+    keep[-1] = True
+    return np.flatnonzero(keep)
+
+
+def _next_out_np(columns, a, i, r2):
+    """The first point from i farther than sqrt(r2) from the point a, in windows of doubling size (n if none)."""
+    n = len(columns[0])
+    width = PREFILTER_RUN
+    while i < n:
+        stop = min(i + width, n)
+        over = np.flatnonzero(sum((col[i:stop] - col[a]) ** 2 for col in columns) > r2)
+        if len(over):
+            return i + int(over[0])
+        i = stop
+        width *= 2
+    return n
+
+
+def take(pts, indices, use_numpy=True):
+    """ProjectedPoints of the points at the indices (numpy arrays if use_numpy and available)."""
+    if use_numpy and np is not None:
+        indices = np.frombuffer(indices, dtype=np.int64)
+        return ProjectedPoints(x[indices] for x in pts.numpy_columns())
+    return ProjectedPoints(array('d', (x[i] for i in indices)) for x in pts.columns)
+
+
+def expand_flags(flags, indices, length):
+    """Flags of the points at the indices to those of all the length points (True if not at the indices)."""
+    result = [True, ] * length
+    for i, flag in zip(indices, flags):
+        if not flag:
+            result[i] = False
+    return result
+
+
+def rank_points_n(trkpts, mode, use_numpy=True, compact_queue=True, stats=None, **params):
+    """Ranks of gpx track points in Douglas-Peucker N for all the levels of detail
+
+    Args:
+        trkpts; an iterable object containing track points,
+            or ProjectedPoints (already projected by the mode).
+        mode; '2d', '3d', '2dt' (see MODES) or Mode(projection, metric).
+        use_numpy; use the vectorized find_farthest_np() if numpy is available.
+        compact_queue; use ArrayPriorityQueue instead of PriorityQueue.
+        stats (optional); stats.Stats to be filled in ('projection' and 'reduce').
+        params; keyword arguments to the projection, e.g. ave_speed.
+
+    Returns:
+        (ranks, distances); see simplify_ranks().
+    """
+    if isinstance(mode, str):
+        mode = MODES[mode]
+
+    if isinstance(trkpts, ProjectedPoints):
+        pts = trkpts
+    else:
+        with phase(stats, 'projection'):
+            pts = mode.projection(trkpts, **params)
+    with phase(stats, 'reduce'):
+        return simplify_ranks(pts, mode.metric, 
+            use_numpy=use_numpy, compact_queue=compact_queue, stats=stats)
+
+
+def simplify_ranks(pts, metric=EUCLIDEAN, use_numpy=True, compact_queue=True, stats=None):
+    """Douglas-Peucker N on projected points, recording the order of insertion
+
+    The points are inserted in the same order as simplify(), so the points
+    of rank < n are those kept by simplify(pts, n) for any n.
+
+    Args:
+        pts; ProjectedPoints
+        metric; Metric, the distance kernel.
+        use_numpy; use the vectorized find_farthest_np() if numpy is available.
+        compact_queue; use ArrayPriorityQueue instead of PriorityQueue.
+        stats (optional); stats.Stats to count the searches and the queue operations.
+
+    Returns:
+        (ranks, distances)
+        ranks; array of integers ('i', or 'q' for huge tracks), rank of each point;
+            0 and 1 for the first and the last points.
+        distances; array('d'), the distance of each point at the insertion,
+            in the projected space (squared if so is the metric); inf for both ends.
+    """
+    length = len(pts)
+    ranks = array('i' if length < 2 ** 31 else 'q', [0, ]) * length
+    distances = array('d', [0.0, ]) * length
+    if length == 0:
+        return ranks, distances
+
+    if compact_queue:
+        queue = ArrayPriorityQueue(length)
+    else:
+        queue = PriorityQueue()
+
+    if use_numpy and np is not None:
+        pts = bounded_columns(pts)
+        find = find_farthest_bounded
+    else:
+        pts = pts.columns
+        find = find_farthest
+
+    if stats is not None:
+        find = stats.counting_find(find)
+        queue = stats.counting_queue(queue)
+
+    ranks[-1] = min(length - 1, 1)
+    distances[0] = distances[-1] = math.inf
+    count = min(length, 2)
+    if length > 2:
+        farthest = find(pts, 0, length - 1, metric)
+        queue.enqueue(farthest[3], farthest)
+
+    while queue.size():
+        start, end, pos, dist = queue.dequeue()
+        ranks[pos] = count
+        distances[pos] = dist
+        count += 1
+
+        if (start + 2 <= pos):
+            farthest = find(pts, start, pos, metric)
+            queue.enqueue(farthest[3], farthest)
+
+        if (pos + 2 <= end):
+            farthest = find(pts, pos, end, metric)
+            queue.enqueue(farthest[3], farthest)
+
+    return ranks, distances
+
+
+def select_ranks(ranks, target_points):
+    """Indices of the points of rank < target_points (see simplify_ranks())"""
+    return [i for i, rank in enumerate(ranks) if rank < target_points]
+
+
+def segment_budgets(lengths, num_points, budget='segment'):
+    """Target number of points for each segment
+
+    Args:
+        lengths; numbers of points in the segments.
+        num_points; number of points in integer
+        budget; 'segment' for num_points in each segment,
+            'split' for num_points in total, in proportion to the lengths
+            (largest remainder method, at least 2 points per segment).
+    """
+    if budget == 'segment':
+        return [num_points, ] * len(lengths)
+    elif budget != 'split':
+        raise ValueError(f'Unknown budget: {budget}')
+
+    total = sum(lengths)
+    if total <= num_points:
+        return list(lengths)
+
+    quotas = [num_points * x / total for x in lengths]
+    targets = [int(x) for x in quotas]
+    remainders = sorted(range(len(lengths)), key=lambda i: targets[i] - quotas[i])
+    for i in remainders[:num_points - sum(targets)]:
+        targets[i] += 1
+    return [max(x, min(2, n)) for x, n in zip(targets, lengths)]
+
+
+def find_farthest(pts, start, end, metric=EUCLIDEAN, stats=None):
+    """Find the farthest point from the segment between start and end
+
+    Args:
+        pts; a tuple of columns (xs, ys[, zs]), array('d') or numpy arrays.
+        start, end; indices of the span.
+        metric; Metric, the distance kernel.
+        stats (optional); stats.Stats to count the distance evaluations.
+
+    Returns:
+        (start, end, pos, dist); pos is the index of the farthest point.
+    """
+    if stats is not None:
+        stats.distance_evaluations += end - start - 1
+    distance = metric.distance
+    if distance is segment_point_distance and len(pts) == 2:
+        return _find_farthest2d(*pts, start, end)
+    elif distance is segment_point_distance3d and len(pts) == 3:
+        return _find_farthest3d(*pts, start, end)
+
+    ab = tuple(float(col[start]) for col in pts) + tuple(float(col[end]) for col in pts)
+    d = 0.0
+    m = -sys.float_info.max
+    c = -1
+
+    for i, p in enumerate(
+            zip(*(col[start + 1:end].tolist() for col in pts)), 
+            start + 1):
+        d = distance(*ab, *p)
+        if m < d:
+            m = d
+            c = i
+    return (start, end, c, m)
+
+
+def _find_farthest2d(xs, ys, start, end):
+    """find_farthest() with segment_point_distance() called directly (typed in the .pxd)"""
+    ax = float(xs[start])
+    ay = float(ys[start])
+    bx = float(xs[end])
+    by = float(ys[end])
+    m = -sys.float_info.max
+    c = -1
+
+    for i, (px, py) in enumerate(
+            zip(xs[start + 1:end].tolist(), ys[start + 1:end].tolist()), 
+            start + 1):
+        d = segment_point_distance(ax, ay, bx, by, px, py)
+        if m < d:
+            m = d
+            c = i
+    return (start, end, c, m)
+
+
+def _find_farthest3d(xs, ys, zs, start, end):
+    """find_farthest() with segment_point_distance3d() called directly (typed in the .pxd)"""
+    ax = float(xs[start])
+    ay = float(ys[start])
+    az = float(zs[start])
+    bx = float(xs[end])
+    by = float(ys[end])
+    bz = float(zs[end])
+    m = -sys.float_info.max
+    c = -1
+
+    for i, (px, py, pz) in enumerate(
+            zip(xs[start + 1:end].tolist(), ys[start + 1:end].tolist(), zs[start + 1:end].tolist()), 
+            start + 1):
+        d = segment_point_distance3d(ax, ay, az, bx, by, bz, px, py, pz)
+        if m < d:
+            m = d
+            c = i
+    return (start, end, c, m)
+
+
+def find_farthest_np(pts, start, end, metric=EUCLIDEAN, stats=None):
+    """Vectorized version of find_farthest()
+
+    Args:
+        pts; a tuple of contiguous float64 numpy arrays (xs, ys[, zs]).
+        start, end; indices of the span.
+        metric; Metric, the distance kernel.
+        stats (optional); stats.Stats to count the distance evaluations.
+
+    Returns:
+        the same result as find_farthest() on the same coordinates.
+    """
+    if end - start < NUMPY_MIN_SPAN:
+        return find_farthest(pts, start, end, metric, stats)
+
+    if stats is not None:
+        stats.distance_evaluations += end - start - 1
+    i, m = _farthest_np(pts, start, end, [col[start + 1:end] for col in pts], metric)
+    return (start, end, i + start + 1, m)
+
+
+def _farthest_np(pts, start, end, ps, metric):
+    """The farthest point among ps (columns of points) from the segment between start and end
+
+    Returns:
+        (i, dist); i is the (first) index of the farthest point in ps.
+    """
+    # Same order of operations as in the distance kernels.
+    a = [float(col[start]) for col in pts]
+    ab = [a_k - float(col[end]) for a_k, col in zip(a, pts)]
+    ab2 = ab[0] * ab[0]
+    t = ab[0] * (a[0] - ps[0])
+    for a_k, ab_k, p_k in zip(a[1:], ab[1:], ps[1:]):
+        ab2 = ab2 + ab_k * ab_k
+        t += ab_k * (a_k - p_k)
+    if ab2 > 0:
+        t /= ab2
+        np.clip(t, 0.0, 1.0, out=t)
+    else:
+        # // A == B
+        t = np.zeros_like(ps[0])
+
+    deltas = [a_k - t * ab_k - p_k for a_k, ab_k, p_k in zip(a, ab, ps)]
+    d2 = deltas[0] * deltas[0]
+    for delta in deltas[1:]:
+        d2 += delta * delta
+
+    if metric.squared:
+        i = int(d2.argmax())
+        return (i, float(d2[i]))
+
+    d2_max = d2.max()
+    if d2_max == 0:
+        return (0, 0.0)
+
+    # np.hypot() and the squared sum may differ from math.hypot() in the last bit.
+    # Rank the near-ties with math.hypot() to choose the same point as find_farthest().
+    m = -sys.float_info.max
+    c = -1
+    for i in np.flatnonzero(d2 >= d2_max * (1.0 - 1e-9)).tolist():
+        d = math.hypot(*(float(delta[i]) for delta in deltas))
+        if m < d:
+            m = d
+            c = i
+    return (c, m)
+
+
+class BoundedColumns(tuple):
+    """Columns (contiguous float64 numpy arrays) with the bounds of their blocks
+
+    The points are divided into blocks of BOUND_BLOCK points.  radius is an
+    array of the largest distance of the points in each block from the chord
+    between the first and the last points of the block; all the points of a
+    block are in the capsule around its chord.  scale is the largest absolute
+    value of the coordinates, for rounding errors.
+    """
+
+    def __new__(cls, columns, block=BOUND_BLOCK):
+        self = super().__new__(cls, columns)
+        length = len(self[0]) // block * block
+        self.block = block
+        blocks = [col[:length].reshape(-1, block) for col in self]
+        self.radius = _distances(
+            [x[:, :1] for x in blocks], 
+            [x[:, :1] - x[:, -1:] for x in blocks], 
+            blocks).max(axis=1)
+        self.scale = max(float(np.abs(col).max()) for col in self) if len(self[0]) else 0.0
+        return self
+
+
+def _distances(a, ab, ps):
+    """Distances of points from segments between a and a - ab (numpy, broadcasting)"""
+    ab2 = sum(ab_k * ab_k for ab_k in ab)
+    t = sum(ab_k * (a_k - p_k) for a_k, ab_k, p_k in zip(a, ab, ps)) / np.where(ab2 > 0, ab2, 1.0)
+    np.clip(t, 0.0, 1.0, out=t)
+    return np.sqrt(sum((a_k - t * ab_k - p_k) ** 2 for a_k, ab_k, p_k in zip(a, ab, ps)))
+
+
+def bounded_columns(pts):
+    """Numpy columns of ProjectedPoints, as BoundedColumns if long enough to be bounded."""
+    columns = pts.numpy_columns()
+    return BoundedColumns(columns) if len(pts) >= BOUND_MIN_SPAN else columns
+
+
+def find_farthest_bounded(pts, start, end, metric=EUCLIDEAN, stats=None):
+    """find_farthest_np() skipping the blocks that cannot contain the farthest point
+
+    The distance to a segment is convex and 1-Lipschitz, so that the distances
+    of the points in a block are not larger than the larger one of its chord
+    ends plus its radius.  The blocks of which this upper bound is below the
+    farthest distance in the most promising block (with a margin for rounding
+    errors) are skipped, and the rest is scanned as in find_farthest_np().
+    This avoids rescanning the parts of long spans far from the farthest
+    point over and over, e.g. a road with an outlier or a spiral.
+
+    Args:
+        pts; BoundedColumns, or a tuple of numpy arrays (same as find_farthest_np()).
+        start, end; indices of the span.
+        metric; Metric, the distance kernel.
+        stats (optional); stats.Stats to count the distance evaluations,
+            those of the bounds of the blocks and of the points scanned.
+
+    Returns:
+        the same result as find_farthest() on the same coordinates.
+    """
+    if end - start < BOUND_MIN_SPAN or not isinstance(pts, BoundedColumns):
+        return find_farthest_np(pts, start, end, metric, stats)
+    pos, dist, evaluations = _farthest_bounded(pts, start, end, start + 1, end, metric)
+    if stats is not None:
+        stats.distance_evaluations += evaluations
+    return (start, end, pos, dist)
+
+
+def _farthest_bounded(pts, start, end, lo, hi, metric):
+    """The farthest point among lo, ..., hi - 1 from the segment between start and end
+
+    See find_farthest_bounded(); pts are BoundedColumns.
+
+    Returns:
+        (pos, dist, evaluations); pos is the (first) index of the farthest
+        point, evaluations is the number of the distances evaluated.
+    """
+    if hi - lo < BOUND_MIN_SPAN:
+        i, m = _farthest_np(pts, start, end, [col[lo:hi] for col in pts], metric)
+        return (i + lo, m, hi - lo)
+
+    block = pts.block
+    first = (lo + block - 1) // block # the first block in [lo, hi)
+    last = hi // block # the end of the blocks in [lo, hi)
+
+    # Upper bounds of the distances in the blocks.
+    a = [float(col[start]) for col in pts]
+    ab = [a_k - float(col[end]) for a_k, col in zip(a, pts)]
+    ub = np.maximum(
+        _distances(a, ab, [col[first * block:last * block:block] for col in pts]), 
+        _distances(a, ab, [col[first * block + block - 1:last * block:block] for col in pts]), 
+        ) + pts.radius[first:last]
+    best = int(ub.argmax())
+    noise = 1e-12 * pts.scale
+    if ub[best] <= 2 * noise:
+        # Straight within rounding errors; the farthest point is decided by them.
+        i, m = _farthest_np(pts, start, end, [col[lo:hi] for col in pts], metric)
+        return (i + lo, m, 2 * len(ub) + hi - lo)
+
+    # The farthest distance in the most promising block, as a lower bound.
+    best += first
+    _, m = _farthest_np(pts, start, end, [col[best * block:(best + 1) * block] for col in pts], metric)
+    if metric.squared:
+        m = math.sqrt(m)
+    blocks = np.flatnonzero(ub >= m - (1e-6 * m + noise)) + first
+    if len(blocks) * 4 > last - first:
+        i, m = _farthest_np(pts, start, end, [col[lo:hi] for col in pts], metric)
+        return (i + lo, m, 2 * len(ub) + block + hi - lo)
+
+    index = np.concatenate((
+        np.arange(lo, first * block), 
+        (blocks[:, None] * block + np.arange(block)).ravel(), 
+        np.arange(last * block, hi), 
+        ))
+    i, m = _farthest_np(pts, start, end, [col[index] for col in pts], metric)
+    return (int(index[i]), m, 2 * len(ub) + block + len(index))
+
+
+def find_farthest_parallel(pts, start, end, metric=EUCLIDEAN, executor=None, threads=1, stats=None):
+    """find_farthest_bounded() with a long span split among threads
+
+    The points of a span of PARALLEL_MIN_SPAN or more are divided into
+    threads ranges (of whole blocks), searched by _farthest_bounded() in the
+    executor; numpy releases the GIL and the columns are shared.  The first
+    one of the farthest points among the ranges is taken, as in the serial scan.
+
+    Args:
+        pts; BoundedColumns (see find_farthest_bounded()).
+        start, end; indices of the span.
+        metric; Metric, the distance kernel.
+        executor; concurrent.futures.ThreadPoolExecutor
+        threads; number of the ranges.
+        stats (optional); stats.Stats to count the distance evaluations of all the ranges.
+
+    Returns:
+        the same result as find_farthest() on the same coordinates.
+    """
+    if end - start < PARALLEL_MIN_SPAN or not isinstance(pts, BoundedColumns):
+        return find_farthest_bounded(pts, start, end, metric, stats)
+
+    size = -(-(end - start - 1) // threads // pts.block) * pts.block
+    bounds = list(range(start + 1, end, max(size, BOUND_MIN_SPAN))) + [end]
+    futures = [
+        executor.submit(_farthest_bounded, pts, start, end, lo, hi, metric)
+        for lo, hi in zip(bounds, bounds[1:])]
+    c = -1
+    m = -sys.float_info.max
+    for future in futures:
+        i, d, evaluations = future.result()
+        if m < d:
+            m = d
+            c = i
+        if stats is not None:
+            stats.distance_evaluations += evaluations
+    return (start, end, c, m)
+
+
+class PriorityQueue():
+    name = "Pairing Heap"
+    _size = 0
+    _root = None
+
+    def _merge(self, i, j):
+        if i is None: return j
+        if j is None: return i
+
+        if i['p'] < j['p']:
+            i, j = j, i
+
+        j['next'] = i['head']
+        i['head'] = j
+
+        return i
+
+    def _mergeList(self, s):
+        n = None
+
+        while s:
+            a = s
+            b = None
+            s = s['next']
+            a['next'] = None
+            if s:
+                b = s
+                s = s['next']
+                b['next'] = None
+
+            a = self._merge(a, b)
+            a['next'] = n
+            n = a
+
+        while n:
+            j = n
+            n = n['next']
+            s = self._merge(j, s)
+
+        return s
+
+    def enqueue(self, priority, value):
+        self._root = self._merge(self._root, {
+            'p': priority,
+            'v': value,
+            'next': None,
+            'head': None,
+            })
+        self._size += 1
+
+    def dequeue(self):
+        result = self._root['v']
+        self._root = self._mergeList(self._root['head'])
+        self._size -= 1
+
+        return result
+
+    def size(self):
+        return self._size
+
+
+class ArrayPriorityQueue():
+    """Pairing heap on preallocated lists
+
+    Same algorithm (and the same order of equal priorities) as
+    PriorityQueue, without allocating a dict per node.  Nodes are
+    indices into the lists and are recycled after dequeue.
+
+    Args:
+        capacity; initial number of nodes, e.g. target_points.
+            The lists are extended if necessary.
+    """
+    name = "Pairing Heap (array)"
+
+    def __init__(self, capacity=1):
+        capacity = max(capacity, 1)
+        self._p = [0.0, ] * capacity
+        self._v = [None, ] * capacity
+        self._next = [-1, ] * capacity
+        self._head = [-1, ] * capacity
+        self._free = -1
+        self._used = 0
+        self._size = 0
+        self._root = -1
+
+    def _grow(self):
+        n = len(self._v)
+        self._p.extend([0.0, ] * n)
+        self._v.extend([None, ] * n)
+        self._next.extend([-1, ] * n)
+        self._head.extend([-1, ] * n)
+
+    def _mergeList(self, s):
+        p = self._p
+        nxt = self._next
+        head = self._head
+        n = -1
+
+        while s >= 0:
+            a = s
+            s = nxt[a]
+            nxt[a] = -1
+            if s >= 0:
+                b = s
+                s = nxt[b]
+                nxt[b] = -1
+                if p[a] < p[b]:
+                    a, b = b, a
+                nxt[b] = head[a]
+                head[a] = b
+
+            nxt[a] = n
+            n = a
+
+        while n >= 0:
+            j = n
+            n = nxt[j]
+            if s >= 0:
+                if p[j] < p[s]:
+                    j, s = s, j
+                nxt[s] = head[j]
+                head[j] = s
+            s = j
+
+        return s
+
+    def enqueue(self, priority, value):
+        i = self._free
+        if i >= 0:
+            self._free = self._next[i]
+        else:
+            i = self._used
+            if i == len(self._v):
+                self._grow()
+            self._used += 1
+
+        self._p[i] = priority
+        self._v[i] = value
+        self._next[i] = -1
+        r = self._root
+        if r < 0:
+            self._head[i] = -1
+            self._root = i
+        elif self._p[r] < priority:
+            self._next[r] = -1
+            self._head[i] = r
+            self._root = i
+        else:
+            self._next[i] = self._head[r]
+            self._head[i] = -1
+            self._head[r] = i
+        self._size += 1
+
+    def dequeue(self):
+        r = self._root
+        result = self._v[r]
+        self._v[r] = None
+        self._root = self._mergeList(self._head[r])
+        self._next[r] = self._free
+        self._free = r
+        self._size -= 1
+
+        return result
+
+    def size(self):
+        return self._size
+
+
+# The compiled accelerator built from this file by setup_accel.py (optional)
+# replaces the public names if importable, unless DPN_PURE_PYTHON is set.
+ACCELERATED = False
+if __name__ != '_douglas_peucker_n_accel' and not os.environ.get('DPN_PURE_PYTHON'):
+    try:
+        from _douglas_peucker_n_accel import *
+        ACCELERATED = True
+    except ImportError:
+        pass
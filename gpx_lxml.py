@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+# Reduce track/route points of a gpx file parsed by lxml.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# The points of every trkseg of every trk (and of every rte) are read into
+# columns and reduced by gpx_stream.reduce_columns().  The children of each
+# parent are then rebuilt at once from the kept points (del parent[:];
+# parent.extend(kept)) instead of removing the points one by one; everything
+# else (metadata, extensions, attributes, whitespace) is kept as is.
+
+from pathlib import Path
+import sys
+import time
+from lxml import etree
+from projection import COLUMNS, parse_times
+from gpx_stream import reduce_columns
+
+# Parents of the points and the tags of the points.
+POINT_TAGS = {
+    'trkseg': 'trkpt',
+    'rte': 'rtept',
+    }
+
+
+def _qualified(namespace, name):
+    return f'{{{namespace}}}{name}' if namespace else name
+
+
+def find_segments(tree, routes=True):
+    """Parents of the points (trkseg, and rte if routes) in document order.
+
+    Returns:
+        a list of (parent element, a list of the point elements)
+    """
+    root = tree.getroot() if hasattr(tree, 'getroot') else tree
+    namespace = etree.QName(root).namespace
+    tags = {
+        _qualified(namespace, parent): _qualified(namespace, point)
+        for parent, point in POINT_TAGS.items() if routes or parent != 'rte'}
+    return [(x, x.findall(tags[x.tag])) for x in root.iter(*tags)]
+
+
+def read_columns(points, mode='2d'):
+    """Columns of the point elements used in the mode
+
+    Elevations are 0.0 if missing; times are in seconds from the first point.
+
+    Returns:
+        a dict of the columns with keys of COLUMNS[mode].
+    """
+    columns = {
+        'latitude': [float(x.get('lat')) for x in points],
+        'longitude': [float(x.get('lon')) for x in points],
+        }
+    namespace = etree.QName(points[0]).namespace if points else None
+    if 'elevation' in COLUMNS[mode]:
+        tag = _qualified(namespace, 'ele')
+        columns['elevation'] = [float(x.findtext(tag) or 0.0) for x in points]
+    if 'time' in COLUMNS[mode]:
+        tag = _qualified(namespace, 'time')
+        texts = [x.findtext(tag) for x in points]
+        if None in texts:
+            raise ValueError(f'A point without time at line {points[texts.index(None)].sourceline}')
+        columns['time'] = parse_times(texts)
+    return columns
+
+
+def _has_times(points):
+    tag = _qualified(etree.QName(points[0]).namespace, 'time') if points else None
+    return all(x.findtext(tag) is not None for x in points)
+
+
+def rebuild(parent, points, flags):
+    """Remove the points flagged True from the parent in one bulk assignment.
+
+    The other children keep their order; the tail (whitespace) of a removed
+    point is removed with it, as parent.remove().
+
+    Args:
+        parent; the parent element of the points.
+        points; a list of the point elements, emptied here to release the
+            removed ones; lxml frees the elements without references at once,
+            instead of moving them to a document of their own.
+        flags; True/False flags (True for the removed points)
+    """
+    if not any(flags):
+        points.clear()
+        return
+    if parent.index(points[-1]) - parent.index(points[0]) == len(points) - 1:
+        # The points are contiguous, as in a valid gpx.
+        kept = list(points[0].itersiblings(preceding=True))[::-1]
+        kept += [x for x, flag in zip(points, flags) if not flag]
+        kept += points[-1].itersiblings()
+    else:
+        removed = {x for x, flag in zip(points, flags) if flag}
+        kept = [x for x in parent if x not in removed]
+        removed = None
+    points.clear()
+    del parent[:]
+    parent.extend(kept)
+
+
+def reduce_tree(tree, num_points=65535, mode='2d', budget='segment', epsilon=None, routes=True):
+    """Reduce the points of all trkseg (and rte) elements of an lxml tree in place
+
+    Args:
+        tree; lxml ElementTree (or the root element) of a gpx document.
+        num_points; number of points in integer
+        mode; '2d', '3d' or '2dt'
+        budget; 'segment', 'split' or 'global' (see reduce_gpx.reduce_gpx()).
+            Routes are counted as segments.
+        epsilon (optional); error tolerance in meters.
+        routes; reduce the route points too; in 2dt, routes with points
+            without time are left as is.
+
+    Returns:
+        a list of (number of points, number of reduced points) for each parent.
+    """
+    segments = find_segments(tree, routes)
+    skipped = set()
+    if mode == '2dt':
+        skipped = {i for i, (parent, points) in enumerate(segments)
+            if etree.QName(parent).localname == 'rte' and not _has_times(points)}
+    flags = iter(reduce_columns(
+        [read_columns(points, mode) for i, (_, points) in enumerate(segments) if i not in skipped],
+        num_points, mode, budget, epsilon))
+    flags = [[False, ] * len(points) if i in skipped else next(flags)
+        for i, (_, points) in enumerate(segments)]
+    counts = [(len(points), seg_flags.count(False)) for (_, points), seg_flags in zip(segments, flags)]
+    for (parent, points), seg_flags in zip(segments, flags):
+        rebuild(parent, points, seg_flags)
+    return counts
+
+
+def write_tree(tree, outfile_path):
+    with Path(outfile_path).open('wb') as f:
+        f.write(etree.tostring(
+            tree, encoding='UTF-8', pretty_print=True,
+            doctype='<?xml version="1.0" encoding="UTF-8"?>'))
+
+
+def reduce_file(gpxdocs, num_points=65535, mode='2d', outfile_path=None, budget='segment',
+        epsilon=None, routes=True):
+    """Reduce the points in a gpx file by lxml, and write it to *_c.gpx
+
+    Args:
+        gpxdocs; Path of the gpx file.
+        outfile_path (optional); Path of the output, *_c.gpx if None.
+        num_points, mode, budget, epsilon, routes; see reduce_tree().
+    """
+    start_time = time.time()
+    tree = etree.parse(str(gpxdocs))
+    for before, after in reduce_tree(tree, num_points, mode, budget, epsilon, routes):
+        print(f'Reduce trkpt: from {before} to {after}')
+    if outfile_path is None:
+        outfile_path = Path(str(gpxdocs)[:-4] + '_c.gpx')
+    write_tree(tree, outfile_path)
+    print(f'Processing Time: {time.time() - start_time} s.')
+
+
+if __name__ == '__main__':
+    argvs = sys.argv
+    argc = len(argvs)
+    if argc < 2:
+        print(f'Usage: # python {argvs[0]} input_filename number_of_points [2d|3d|2dt]\n')
+        sys.exit(0)
+    in_file = argvs[1]
+    points = 2000 if argc < 3 else int(argvs[2])
+    mode = '2d' if argc < 4 else argvs[3]
+    reduce_file(Path(in_file), points, mode)
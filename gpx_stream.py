@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+#
+# Reduce track points of a large gpx file without building the whole DOM.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# Pass 1 parses the file by expat and keeps only the columns used in the mode
+# (latitude, longitude, elevation, time) plus the byte offsets of each trkpt.
+# Pass 2 copies the original bytes through, skipping the removed trkpts.
+# Memory use is proportional to the arrays, not to the size of the document.
+
+from array import array
+import contextlib
+import io
+import math
+from pathlib import Path
+import re
+import shutil
+import sys
+import time
+from xml.parsers import expat
+from projection import COLUMNS, PROJECTIONS, _parse_time
+from stats import phase
+from douglas_peucker_n import MODES, epsilon_threshold, segment_budgets, simplify, simplify_segments
+
+CHUNK_SIZE = 1 << 20
+WHITESPACE = b' \t\r\n'
+
+
+class StreamSegment():
+    """Columns of the track points in a trkseg and their byte offsets in the file.
+
+    columns; a dict of array('d') with keys of COLUMNS[mode].
+        Times are in seconds (POSIX time), taken as UTC if without offset.
+    starts; byte offsets of the start tags of trkpts.
+    ends; byte offsets just past the end tags of trkpts (or of the empty element tags).
+    """
+
+    def __init__(self, names):
+        self.columns = {name: array('d') for name in names}
+        self.starts = array('q')
+        self.ends = array('q')
+
+    def __len__(self):
+        return len(self.starts)
+
+
+def _localname(name):
+    return name.rpartition(':')[2]
+
+
+def _open(gpxdocs):
+    """Open the Path in binary, or rewind a (seekable) binary file object, not closed."""
+    if hasattr(gpxdocs, 'read'):
+        gpxdocs.seek(0)
+        return contextlib.nullcontext(gpxdocs)
+    return gpxdocs.open('rb')
+
+
+def read_segments(gpxdocs, mode='2d', names=None):
+    """Pass 1; read the columns used in the mode of all trksegs.
+
+    Args:
+        gpxdocs; Path of the gpx file, or a seekable binary file object.
+        mode; '2d', '3d' or '2dt'
+        names (optional); the columns to read instead of COLUMNS[mode];
+            missing times are NaN instead of an error (elevations are 0.0).
+
+    Returns:
+        a list of StreamSegment in document order.
+    """
+    defaults = {'elevation': 0.0}
+    if names is None:
+        names = COLUMNS[mode]
+    else:
+        defaults['time'] = math.nan
+    segments = []
+    segment = None
+    point = None
+    line = 0
+    text = []
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+
+    def start_element(name, attrs):
+        nonlocal segment, point, line
+        name = _localname(name)
+        if name == 'trkseg':
+            segment = StreamSegment(names)
+        elif name == 'trkpt' and segment is not None:
+            segment.starts.append(parser.CurrentByteIndex)
+            line = parser.CurrentLineNumber
+            point = dict(defaults, latitude=float(attrs['lat']), longitude=float(attrs['lon']))
+        text.clear()
+
+    def end_element(raw_name):
+        nonlocal segment, point
+        name = _localname(raw_name)
+        if point is not None:
+            if name == 'trkpt':
+                segment.ends.append(_end_offset(parser, raw_name))
+                if 'time' in names and 'time' not in point:
+                    raise ValueError(
+                        f'A point without time at line {line} (byte {segment.starts[-1]})')
+                for key in names:
+                    segment.columns[key].append(point[key])
+                point = None
+            elif name == 'ele':
+                point['elevation'] = float(''.join(text))
+            elif name == 'time':
+                point['time'] = _parse_time(''.join(text)).timestamp()
+        elif name == 'trkseg' and segment is not None:
+            segments.append(segment)
+            segment = None
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = text.append
+    with _open(gpxdocs) as f:
+        parser.ParseFile(f)
+    return segments
+
+
+def _end_offset(parser, name):
+    """Byte offset just past the end tag of the element at the end event.
+
+    At the end event of an empty element (<trkpt .../>), CurrentByteIndex is
+    already past it; otherwise it is at the end tag, in the input buffer.
+    """
+    index = parser.CurrentByteIndex
+    context = parser.GetInputContext() or b''
+    if re.match(b'</' + re.escape(name.encode()) + rb'[ \t\r\n]*>', context):
+        return index + context.index(b'>') + 1
+    return index
+
+
+def reduce_segments(segments, num_points, mode='2d', budget='segment', epsilon=None, 
+        stats=None):
+    """Reduce StreamSegments
+
+    Args:
+        segments; a list of StreamSegment.
+        num_points; number of points in integer
+        mode; '2d', '3d' or '2dt'
+        budget; 'segment', 'split' or 'global' (see reduce_gpx.reduce_gpx()).
+        epsilon (optional); error tolerance in meters.
+        stats (optional); stats.Stats to be filled in.
+
+    Returns:
+        a list of flags for each segment; True/False flags (True for the removed points)
+    """
+    return reduce_columns(
+        [segment.columns for segment in segments], num_points, mode, budget, epsilon, stats)
+
+
+def reduce_columns(segments, num_points, mode='2d', budget='segment', epsilon=None, 
+        stats=None):
+    """Reduce segments given by the columns of their points, see reduce_segments()
+
+    Args:
+        segments; a list of dicts of the columns (sequences of float) with keys
+            of COLUMNS[mode], one for each segment.  Times are in seconds.
+
+    Returns:
+        a list of flags for each segment; True/False flags (True for the removed points)
+    """
+    metric = MODES[mode].metric
+    lengths = [len(x[COLUMNS[mode][0]]) for x in segments]
+    pts = []
+    with phase(stats, 'projection'):
+        for segment, length in zip(segments, lengths):
+            columns = [segment[name] for name in COLUMNS[mode]]
+            params = {}
+            if mode == '2dt' and length:
+                t = columns[2]
+                columns[2] = array('d', (x - t[0] for x in t))
+                params['ave_speed'] = 'auto'
+            pts.append(PROJECTIONS[mode](*columns, **params) if length else None)
+
+    with phase(stats, 'reduce'):
+        if budget == 'global':
+            pts = [x for x in pts if x is not None]
+            flags = iter(simplify_segments(pts, num_points, metric, 
+                tolerance=epsilon_threshold(MODES[mode], pts, epsilon), stats=stats))
+            return [next(flags) if x else [] for x in lengths]
+
+        flags = []
+        targets = segment_budgets(lengths, num_points, budget)
+        for length, target, x in zip(lengths, targets, pts):
+            if target < length or (epsilon is not None and length > 2):
+                flags.append(simplify(x, target, metric, 
+                    tolerance=epsilon_threshold(MODES[mode], [x, ], epsilon), stats=stats))
+            else:
+                flags.append([False, ] * length)
+        return flags
+
+
+def removed_ranges(segments, flags):
+    """Byte ranges [start tag, past the end tag) of the removed trkpts in document order."""
+    for segment, seg_flags in zip(segments, flags):
+        for start, end, flag in zip(segment.starts, segment.ends, seg_flags):
+            if flag:
+                yield start, end
+
+
+def write_reduced(gpxdocs, out, ranges):
+    """Pass 2; copy the gpx file to out (binary), skipping the ranges.
+
+    Whitespace before each removed trkpt is also skipped to keep the indentation.
+    gpxdocs is a Path or a seekable binary file object as read_segments().
+    """
+    with _open(gpxdocs) as f:
+        pos = 0
+        for start, end in ranges:
+            if start < pos:
+                raise ValueError(f'Overlapping ranges at byte {start} (copied to {pos})')
+            _copy(f, out, start - pos, strip=True)
+            f.seek(end)
+            pos = end
+        shutil.copyfileobj(f, out, CHUNK_SIZE)
+
+
+def _copy(f, out, size, strip=False):
+    while size > CHUNK_SIZE:
+        out.write(f.read(CHUNK_SIZE))
+        size -= CHUNK_SIZE
+    chunk = f.read(size)
+    out.write(chunk.rstrip(WHITESPACE) if strip else chunk)
+
+
+def reduce_gpx_data(data, num_points=65535, mode='2d', budget='segment', epsilon=None):
+    """Reduce track points in a gpx document in memory, as reduce_gpx_stream()
+
+    Args:
+        data; the gpx document in bytes.
+        num_points, mode, budget, epsilon; see reduce_gpx_stream().
+
+    Returns:
+        (the reduced document in bytes, a list of (number of points, number of reduced points)
+        for each segment)
+    """
+    source = io.BytesIO(data)
+    segments = read_segments(source, mode)
+    flags = reduce_segments(segments, num_points, mode, budget, epsilon)
+    out = io.BytesIO()
+    write_reduced(source, out, removed_ranges(segments, flags))
+    return out.getvalue(), [(len(x), y.count(False)) for x, y in zip(segments, flags)]
+
+
+def reduce_gpx_stream(gpxdocs, num_points=65535, mode='2d', outfile_path=None, budget='segment', 
+        epsilon=None, stats=None):
+    """Reduce track points in a gpx file by streaming, and write it to *_c.gpx
+
+    Only trkpts are removed; everything else is copied as is.
+
+    Args:
+        gpxdocs; Path of the gpx file.
+        num_points; number of points in integer
+        mode; '2d', '3d' or '2dt'
+        outfile_path (optional); Path of the output, *_c.gpx if None.
+        budget; 'segment', 'split' or 'global' (see reduce_gpx.reduce_gpx()).
+        epsilon (optional); error tolerance in meters.
+        stats (optional); stats.Stats to be filled in with the times of
+            'parse', 'projection', 'reduce' and 'serialize' and the counters.
+    """
+    start_time = time.time()
+    with phase(stats, 'parse'):
+        segments = read_segments(gpxdocs, mode)
+    print(f'Read: {time.time() - start_time} s')
+
+    flags = reduce_segments(segments, num_points, mode, budget, epsilon, stats)
+    for segment, seg_flags in zip(segments, flags):
+        print(f'Reduce trkpt: from {len(segment)} to {seg_flags.count(False)}')
+    print(f'Reduce: {time.time() - start_time} s')
+
+    if outfile_path is None:
+        outfile_path = Path(str(gpxdocs)[:-4] + '_c.gpx')
+    with phase(stats, 'serialize'), open(outfile_path, 'wb') as out:
+        write_reduced(gpxdocs, out, removed_ranges(segments, flags))
+    print(f'Time: {time.time() - start_time} s')
+
+
+if __name__ == '__main__':
+    argvs = sys.argv
+    argc = len(argvs)
+    if argc < 2:
+        print(f'Usage: # python {argvs[0]} input_filename number_of_points [2d|3d|2dt]\n')
+        sys.exit(0)
+    in_file = argvs[1]
+    points = 2000 if argc < 3 else int(argvs[2])
+    mode = '2d' if argc < 4 else argvs[3]
+    reduce_gpx_stream(Path(in_file), points, mode)
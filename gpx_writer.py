@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# Streaming serialization of gpxpy documents.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# gpx.to_xml() builds the whole document as one string before it is written.
+# write_gpx() serializes the document without the track points once, then
+# writes it to a binary file handle with the track points of each segment
+# serialized and encoded in chunks, so that the memory use is bounded by the
+# chunk instead of the document.  The bytes are the same as to_xml() in UTF-8.
+#
+# Track points having only lat/lon/ele/time (the most common case) are
+# formatted directly by the converters of gpxpy, the others by gpxpy itself.
+
+from operator import attrgetter
+import re
+import sys
+from xml.sax.saxutils import escape
+from gpxpy import gpxfield
+from gpxpy.gpx import GPXTrackPoint
+from gpxpy.utils import make_str
+
+CHUNK_POINTS = 4096
+BUFFER_SIZE = 1 << 20
+
+
+class _PointsMarker():
+    """A track point without fields, serialized as an empty trkpt to mark the segments."""
+
+    gpx_10_fields = gpx_11_fields = ()
+
+
+# An empty trkpt (a trkpt has always lat/lon attributes) with its indent.
+_MARKER = re.compile(r'\n( *)<trkpt>\n\1</trkpt>')
+
+PLAIN_FIELDS = ('latitude', 'longitude', 'elevation', 'time')
+
+
+def _other_fields(version):
+    """attrgetter of the fields of trkpt (but extensions) other than PLAIN_FIELDS."""
+    fields = GPXTrackPoint.gpx_11_fields if version == '1.1' else GPXTrackPoint.gpx_10_fields
+    names = [
+        x.name for x in fields if not isinstance(x, str) 
+        and x.name not in PLAIN_FIELDS and x.name != 'extensions']
+    return attrgetter(*names), len(names)
+
+
+def trkpts_xml(trkpts, version, nsmap, indent):
+    """Serialize track points as gpxpy, the plain ones (see PLAIN_FIELDS) directly."""
+    others, num_others = _other_fields(version)
+    result = []
+    for trkpt in trkpts:
+        if trkpt.extensions or others(trkpt).count(None) != num_others:
+            result.append(gpxfield.gpx_fields_to_xml(
+                trkpt, 'trkpt', version, nsmap=nsmap, indent=indent))
+            continue
+        result.append(
+            f'\n{indent}<trkpt lat="{make_str(trkpt.latitude)}" lon="{make_str(trkpt.longitude)}">')
+        if trkpt.elevation is not None:
+            result.append(f'\n{indent}  <ele>{escape(make_str(trkpt.elevation))}</ele>')
+        if trkpt.time:
+            result.append(f'\n{indent}  <time>{escape(gpxfield.format_time(trkpt.time))}</time>')
+        result.append(f'\n{indent}</trkpt>')
+    return ''.join(result)
+
+
+def write_gpx(gpx, out=None, version='1.1', chunk_points=CHUNK_POINTS):
+    """Write gpx xml to a binary file handle as gpx.to_xml(version)
+
+    The metadata, extensions and attributes are serialized by gpxpy as is.
+
+    Args:
+        gpx; gpxpy.gpx.GPX
+        out (optional); a binary file handle (sys.stdout.buffer if None).
+        version; '1.0' or '1.1'
+        chunk_points; number of track points serialized and written at once.
+    """
+    if out is None:
+        out = sys.stdout.buffer
+    segments = [segment for track in gpx.tracks for segment in track.segments]
+    points = [segment.points for segment in segments]
+    try:
+        for segment in segments:
+            segment.points = [_PointsMarker()]
+        skeleton = _MARKER.split(gpx.to_xml(version))
+    finally:
+        for segment, trkpts in zip(segments, points):
+            segment.points = trkpts
+
+    out.write(skeleton[0].encode())
+    for trkpts, indent, text in zip(points, skeleton[1::2], skeleton[2::2]):
+        for i in range(0, len(trkpts), chunk_points):
+            out.write(trkpts_xml(
+                trkpts[i:i + chunk_points], version, gpx.nsmap, indent).encode())
+        out.write(text.encode())
+
+
+def save_gpx(gpx, outfile_path, version='1.1'):
+    """Write gpx xml to the outfile_path by write_gpx() through a buffer of BUFFER_SIZE."""
+    with open(outfile_path, 'wb', buffering=BUFFER_SIZE) as out:
+        write_gpx(gpx, out, version)
@@ -1,16 +1,8 @@
 # -*- coding: utf-8 -*-
 
-from collections import namedtuple
-import time
 from pathlib import Path
 import sys
-from lxml import etree
-import reduce_points_3d
-
-start_t = time.time()
-
-Trackpt = namedtuple('Trackpt', 'longitude, latitude, elevation')
-Trackpt.__new__.__defaults__ = (None,) * len(Trackpt._fields)
+import gpx_lxml
 
 argvs = sys.argv
 argc = len(argvs)
@@ -19,35 +11,5 @@ if argc < 2:
     sys.exit(0)
 in_file = argvs[1]
 points = 2000 if argc < 3 else int(argvs[2])
-out_file = Path(str(in_file)[:-4] + '_c.gpx')
-
-tree = etree.parse(in_file)
-NSMAP = tree.getroot().nsmap
-trk = tree.findall('trk', namespaces=NSMAP)
-trkseg = [x.findall('trkseg', namespaces=NSMAP) for x in trk][0]
-trkpts = [x.findall('trkpt', namespaces=NSMAP) for x in trkseg][0]
-
-if len(trkpts) < points:
-    print(f'Error: cannot reduce from {len(trkpts)} to {points}.')
-    sys.exit(1)
-
-gpx_segment = [Trackpt(
-    longitude=float(x.attrib['lon']), 
-    latitude=float(x.attrib['lat']), 
-    elevation=float(x.findall('ele', namespaces=NSMAP)[0].text), 
-    ) 
-    for x in trkpts]
-
-rm_trkpts = reduce_points_3d.reduce_points3d(gpx_segment, target_points=points, flags_out=True)
-
-parent = trkpts[0].getparent()
-for trkpt, rm_trkpt in zip(trkpts, rm_trkpts):
-    if rm_trkpt:
-        parent.remove(trkpt)
-
-with out_file.open('wb') as f:
-    f.write(etree.tostring(
-        tree, encoding='UTF-8', pretty_print=True, 
-        doctype='<?xml version="1.0" encoding="UTF-8"?>'))
 
-print(f'Processing Time: {time.time() - start_t} s.')
+gpx_lxml.reduce_file(Path(in_file), points, '3d')
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+# Douglas-Peucker N for live tracks, growing by appended points.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# The track is split into blocks of block_size points sharing their boundary
+# points.  Each block is ranked once by simplify_ranks() when it is closed; only
+# the open block at the tail is ranked again after new points are appended.
+# The N-point simplification is a merge of the insertion orders of the blocks
+# by their distances, i.e. Douglas-Peucker N with a queue shared among the
+# blocks (as simplify_segments()); the maximum error is given by the next
+# point in the merge.
+#
+# simplify_stream() reduces an unbounded iterator of track points window by
+# window, with the memory bounded by the window size.
+
+from array import array
+import heapq
+import math
+from projection import COLUMNS, PROJECTIONS
+from douglas_peucker_n import MODES, reduce_points_n, simplify_ranks
+
+
+class OnlineSimplifier():
+    """Incremental Douglas-Peucker N of track points appended one by one
+
+    Args:
+        mode; '2d', '3d' or '2dt'
+        block_size; number of points in a closed block.  The boundaries of
+            the blocks (one in block_size points) are always kept.
+        use_numpy; use the vectorized find_farthest_np() if numpy is available.
+        params; keyword arguments to the projection, e.g. ave_speed of '2dt'
+            (fixed in advance for live tracks).
+
+    Usage:
+        simplifier = OnlineSimplifier('2d')
+        for trkpt in live_track:
+            simplifier.append(trkpt)
+            reduced_points = simplifier.simplify(2000)
+            error = simplifier.max_error
+    """
+
+    def __init__(self, mode='2d', block_size=4096, use_numpy=True, **params):
+        if block_size < 2:
+            raise ValueError('block_size should be 2 or more')
+        self.mode = mode
+        self.block_size = block_size
+        self.use_numpy = use_numpy
+        self.params = params
+        self.points = []
+        self.columns = [array('d') for _ in COLUMNS[mode]]
+        self.start_time = None
+        self.blocks = [] # (order, distances) of the closed blocks
+        self.tail = None # (order, distances) of the open block, None if not ranked
+        self.max_error = 0.0
+
+    def __len__(self):
+        return len(self.points)
+
+    def append(self, trkpt):
+        """Append a track point with attributes of latitude/longitude (elevation/time)."""
+        for name, column in zip(COLUMNS[self.mode], self.columns):
+            if name == 'time':
+                if self.start_time is None:
+                    self.start_time = trkpt.time
+                column.append((trkpt.time - self.start_time).total_seconds())
+            else:
+                column.append(getattr(trkpt, name))
+        self.points.append(trkpt)
+        self.tail = None
+
+        start = len(self.blocks) * (self.block_size - 1)
+        if len(self.points) - start == self.block_size:
+            self.blocks.append(self._rank(start, len(self.points)))
+
+    def extend(self, trkpts):
+        for trkpt in trkpts:
+            self.append(trkpt)
+
+    def _rank(self, start, end):
+        """Insertion order of the interior points in [start, end) with their distances."""
+        pts = PROJECTIONS[self.mode](
+            *(x[start:end] for x in self.columns), use_numpy=False, **self.params)
+        ranks, distances = simplify_ranks(pts, MODES[self.mode].metric, use_numpy=self.use_numpy)
+        order = array('q', [0, ]) * len(ranks)
+        for i, rank in enumerate(ranks):
+            order[rank] = start + i
+        order = order[2:]
+        return order, array('d', (distances[i - start] for i in order))
+
+    def indices(self, target_points=None):
+        """Indices of the reduced points
+
+        Args:
+            target_points; number of points in integer (None for all the points).
+                At least the boundaries of the blocks are kept.
+
+        Returns:
+            a sorted list of the indices.  max_error is updated.
+        """
+        length = len(self.points)
+        if target_points is None:
+            target_points = length
+        start = len(self.blocks) * (self.block_size - 1)
+        if self.tail is None:
+            self.tail = self._rank(start, length) if length - start > 2 else (array('q'), array('d'))
+
+        kept = list(range(0, start + 1, self.block_size - 1)) if length else []
+        if length - 1 > start:
+            kept.append(length - 1)
+        count = len(kept)
+
+        blocks = self.blocks + [self.tail, ]
+        heads = [(-distances[0], k, 0) for k, (_, distances) in enumerate(blocks) if distances]
+        heapq.heapify(heads)
+        while heads and count < target_points:
+            _, k, j = heads[0]
+            order, distances = blocks[k]
+            kept.append(order[j])
+            count += 1
+            if j + 1 < len(order):
+                heapq.heapreplace(heads, (-distances[j + 1], k, j + 1))
+            else:
+                heapq.heappop(heads)
+
+        error = -heads[0][0] if heads else 0.0
+        self.max_error = math.sqrt(error) if MODES[self.mode].metric.squared else error
+        kept.sort()
+        return kept
+
+    def simplify(self, target_points=None):
+        """Reduced track points (see indices()).
+
+        max_error is the largest distance of the removed points from the
+        reduced track in the projected space (see projection.py).
+        """
+        return [self.points[i] for i in self.indices(target_points)]
+
+
+def simplify_stream(trkpts, target_points, mode='2d', window_size=4096, epsilon=None, 
+        use_numpy=True, **params):
+    """Reduce an iterator of track points in windows, yielding the reduced points
+
+    Each window of window_size points is reduced by reduce_points_n(); the
+    last point of a window is the first point of the next one, so that
+    both ends of each window are kept and yielded only once.
+
+    Args:
+        trkpts; an iterable object (e.g. a generator) of track points.
+        target_points; number of points in integer for each window
+            (or None with epsilon).
+        mode; '2d', '3d' or '2dt'
+        window_size; number of points in a window (3 or more).
+        epsilon (optional); error tolerance in meters.
+        use_numpy; use the vectorized find_farthest_np() if numpy is available.
+        params; keyword arguments to the projection, e.g. ave_speed.
+
+    Yields:
+        the reduced track points in order.
+    """
+    if window_size < 3:
+        raise ValueError('window_size should be 3 or more')
+    window = []
+    skip = 0
+    for trkpt in trkpts:
+        window.append(trkpt)
+        if len(window) == window_size:
+            yield from reduce_points_n(window, target_points, mode, 
+                use_numpy=use_numpy, epsilon=epsilon, **params)[skip:]
+            window = window[-1:]
+            skip = 1
+    if len(window) > skip:
+        yield from reduce_points_n(window, target_points, mode, 
+            use_numpy=use_numpy, epsilon=epsilon, **params)[skip:]
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+#
+# Batch coordinate projections for the Douglas-Peucker N reducers.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# The projections take columns (sequences) of latitude, longitude, elevation
+# and time, and return the projected coordinates as a structure of arrays;
+# one float64 array per axis instead of one tuple per point.
+
+from array import array
+from datetime import datetime, timezone
+import math
+import statistics
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+A = 6378137.0 # Semi-major axis (WGS84) in meters
+F = 1 / 298.257223563 # Flattening (WGS84)
+
+AVE_SPEED = 5.556 # m/s, ave_speed if it cannot be estimated
+METERS_PER_DEGREE = 111319 # m / deg., approximately.
+STOPPED_SPEED = 1 / 3.6 # m/s, steps slower than this are not moving
+SPEED_ESTIMATES = ('auto', 'moving', 'median')
+
+
+class ProjectedPoints():
+    """Projected coordinates in a structure of arrays.
+
+    Args:
+        columns; a tuple of float64 arrays, one for each axis.
+            Either array('d') or 1-D numpy arrays of the same length.
+    """
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    @property
+    def dim(self):
+        return len(self.columns)
+
+    def numpy_columns(self):
+        """Return the columns as contiguous float64 numpy arrays (zero-copy from array('d'))."""
+        return tuple(
+            np.frombuffer(c, dtype=np.float64) if isinstance(c, array)
+            else np.ascontiguousarray(c, dtype=np.float64)
+            for c in self.columns)
+
+
+def latlng2xyz(lat, lng, h=0.0):
+    a = A
+    f = F
+    e2 = f * (2 - f)
+    f2 = 1 - e2
+
+    latrad = math.radians(lat)
+    lngrad = math.radians(lng)
+
+    sinlat = math.sin(latrad)
+    coslat = math.cos(latrad)
+    sinlng = math.sin(lngrad)
+    coslng = math.cos(lngrad)
+
+    w2 = 1.0 - sinlat * sinlat * e2
+    w = math.sqrt(w2)
+    N = a / w
+
+    return (
+            (N + h) * coslat * coslng,
+            (N + h) * coslat * sinlng,
+            (N * f2 + h) * sinlat,
+           )
+
+
+def latlngt2xyz(lat, lng, t, ave_speed):
+
+    # Mercator coordinates in radians
+    x = math.asinh(math.tan(math.radians(lat)))
+    y = math.radians(lng)
+
+    # Scale times [s] using averaged speed [m/s]
+    a = A # Radius in meters
+    z = t * ave_speed / a
+
+    return (x, y, z)
+
+
+def _use_numpy(use_numpy):
+    return use_numpy and np is not None
+
+
+def mercator(lat, lng, use_numpy=True):
+    """Mercator projection (sphere) used by reduce_points2()
+
+    Args:
+        lat, lng; columns of latitude/longitude in decimal degrees.
+        use_numpy; vectorize by numpy if available.  The results may
+            differ from those of the math module in the last bit.
+
+    Returns:
+        ProjectedPoints of (x, y) = (longitude, Mercator latitude) in radians.
+    """
+    if _use_numpy(use_numpy):
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        return ProjectedPoints((
+            np.radians(lng),
+            np.arcsinh(np.tan(np.radians(lat))),
+            ))
+
+    return ProjectedPoints((
+        array('d', (math.radians(x) for x in lng)),
+        array('d', (math.asinh(math.tan(math.radians(y))) for y in lat)),
+        ))
+
+
+def ecef(lat, lng, h, use_numpy=True):
+    """Cartesian coordinates on the ellipsoid used by reduce_points3d()
+
+    Args:
+        lat, lng; columns of latitude/longitude in decimal degrees.
+        h; a column of elevation in meters.
+        use_numpy; vectorize by numpy if available.
+
+    Returns:
+        ProjectedPoints of (x, y, z) in meters.
+    """
+    if _use_numpy(use_numpy):
+        e2 = F * (2 - F)
+        f2 = 1 - e2
+        latrad = np.radians(np.asarray(lat, dtype=np.float64))
+        lngrad = np.radians(np.asarray(lng, dtype=np.float64))
+        h = np.asarray(h, dtype=np.float64)
+
+        sinlat = np.sin(latrad)
+        coslat = np.cos(latrad)
+        N = A / np.sqrt(1.0 - sinlat * sinlat * e2)
+
+        return ProjectedPoints((
+            (N + h) * coslat * np.cos(lngrad),
+            (N + h) * coslat * np.sin(lngrad),
+            (N * f2 + h) * sinlat,
+            ))
+
+    xs, ys, zs = array('d'), array('d'), array('d')
+    for x, y, z in map(latlng2xyz, lat, lng, h):
+        xs.append(x)
+        ys.append(y)
+        zs.append(z)
+    return ProjectedPoints((xs, ys, zs))
+
+
+def mercator_time(lat, lng, t, ave_speed=5.556, use_numpy=True):
+    """Mercator projection (sphere) plus scaled time used by reduce_points2dt()
+
+    Args:
+        lat, lng; columns of latitude/longitude in decimal degrees.
+        t; a column of time in seconds (e.g. from the first point).
+        ave_speed; averaged speed in m/s used for scaling times, or estimated
+            in the same pass as the projection (see estimate_speed());
+            'auto' for the length over the duration (as average_speed()),
+            'moving' for that of the moving steps only, 'median' for the
+            median speed of the steps.
+        use_numpy; vectorize by numpy if available.  The results may
+            differ from those of the math module in the last bit.
+
+    Returns:
+        ProjectedPoints of (x, y, z) = (Mercator latitude, longitude, time * ave_speed)
+        in radians.
+    """
+    if _use_numpy(use_numpy):
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        t = np.asarray(t, dtype=np.float64)
+        latrad = np.radians(lat)
+        if isinstance(ave_speed, str):
+            steps = np.hypot(lat[:-1] - lat[1:], (lng[:-1] - lng[1:]) * np.cos(latrad[:-1]))
+            ave_speed = estimate_speed(ave_speed, steps, t)
+        return ProjectedPoints((
+            np.arcsinh(np.tan(latrad)),
+            np.radians(lng),
+            t * ave_speed / A,
+            ))
+
+    a = A
+    if isinstance(ave_speed, str):
+        xs, ys, steps = array('d'), array('d'), array('d')
+        for i, (x, y) in enumerate(zip(lat, lng)):
+            latrad = math.radians(x)
+            xs.append(math.asinh(math.tan(latrad)))
+            ys.append(math.radians(y))
+            if i:
+                steps.append(math.hypot(x_1 - x, (y_1 - y) * cos_1))
+            x_1, y_1, cos_1 = x, y, math.cos(latrad)
+        ave_speed = estimate_speed(ave_speed, steps, t)
+        return ProjectedPoints((xs, ys, array('d', (z * ave_speed / a for z in t))))
+
+    return ProjectedPoints((
+        array('d', (math.asinh(math.tan(math.radians(x))) for x in lat)),
+        array('d', (math.radians(y) for y in lng)),
+        array('d', (z * ave_speed / a for z in t)),
+        ))
+
+
+def average_speed(lat, lng, t):
+    """Averaged speed in m/s along the track, used as ave_speed of mercator_time()
+
+    Args:
+        lat, lng; columns of latitude/longitude in decimal degrees.
+        t; a column of time in seconds.
+    """
+    length_2d = 111319 * sum( # 111319 m / deg., approximately.
+        math.hypot(y_1 - y, (x_1 - x) * math.cos(math.radians(y_1)))
+        for y_1, x_1, y, x in zip(lat, lng, lat[1:], lng[1:]))
+    duration = t[-1] - t[0]
+    return length_2d / duration
+
+
+def estimate_speed(method, steps, t):
+    """Averaged speed in m/s for ave_speed of mercator_time()
+
+    Args:
+        method; 'auto' for the length over the duration (as average_speed()),
+            'moving' for the length over the duration of the steps not slower
+            than STOPPED_SPEED, 'median' for the median speed of the steps.
+        steps; distances in degrees between the adjacent points
+            (hypot of latitude and longitude * cos(latitude)), a numpy array or array('d').
+        t; a column of time in seconds.
+
+    Returns:
+        the speed, or AVE_SPEED if it is not positive (e.g. no duration).
+    """
+    if method not in SPEED_ESTIMATES:
+        raise ValueError(f'Unknown ave_speed: {method}')
+    if len(t) < 2 or not t[-1] > t[0]:
+        return AVE_SPEED
+
+    if isinstance(steps, array):
+        if method == 'auto':
+            speed = METERS_PER_DEGREE * sum(steps) / (t[-1] - t[0])
+        else:
+            pairs = [
+                (METERS_PER_DEGREE * step, t_1 - t_0)
+                for step, t_0, t_1 in zip(steps, t, t[1:]) if t_1 > t_0]
+            if method == 'moving':
+                pairs = [(d, dt) for d, dt in pairs if d >= STOPPED_SPEED * dt]
+                duration = sum(dt for _, dt in pairs)
+                speed = sum(d for d, _ in pairs) / duration if duration else 0.0
+            else:
+                speed = statistics.median(d / dt for d, dt in pairs) if pairs else 0.0
+    else:
+        if method == 'auto':
+            speed = METERS_PER_DEGREE * steps.sum() / (t[-1] - t[0])
+        else:
+            dt = np.diff(t)
+            d = METERS_PER_DEGREE * steps[dt > 0]
+            dt = dt[dt > 0]
+            if method == 'moving':
+                moving = d >= STOPPED_SPEED * dt
+                duration = dt[moving].sum()
+                speed = d[moving].sum() / duration if duration else 0.0
+            else:
+                speed = np.median(d / dt) if len(dt) else 0.0
+    speed = float(speed)
+    return speed if speed > 0 else AVE_SPEED
+
+
+def _days_from_civil(year, month, day):
+    """Days since 1970-01-01 of the dates (proleptic Gregorian) in numpy arrays."""
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (month > 2) * -3 + (month <= 2) * 9) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _parse_time(text):
+    """datetime of an ISO-8601 timestamp, taken as UTC if without offset."""
+    time = datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+    return time if time.tzinfo is not None else time.replace(tzinfo=timezone.utc)
+
+
+def _times_np(texts):
+    """Microseconds since the epoch (int64) of fixed format timestamps by numpy, or None.
+
+    All the timestamps should be 'YYYY-MM-DDThh:mm:ssZ' or with fractions
+    of the same number of digits, and valid dates and times; None otherwise.
+    """
+    length = len(texts[0])
+    if length < 20 or length == 21:
+        return None
+    try:
+        b = np.frombuffer(''.join(texts).encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return None
+    if len(b) != length * len(texts):
+        return None
+    b = b.reshape(len(texts), length)
+    separators = {4: b'-', 7: b'-', 10: b'T', 13: b':', 16: b':', length - 1: b'Z'}
+    if length > 20:
+        separators[19] = b'.'
+    digits = [i for i in range(length) if i not in separators]
+    if not all((b[:, i] == ord(c)).all() for i, c in separators.items()):
+        return None
+    d = b[:, digits].astype(np.int64) - ord('0')
+    if not ((d >= 0) & (d <= 9)).all():
+        return None
+
+    def number(start, end):
+        result = d[:, start]
+        for i in range(start + 1, end):
+            result = result * 10 + d[:, i]
+        return result
+
+    year, month, day = number(0, 4), number(4, 6), number(6, 8)
+    hour, minute, second = number(8, 10), number(10, 12), number(12, 14)
+    if not ((year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+            & (hour <= 23) & (minute <= 59) & (second <= 59)).all():
+        return None
+    month_days = np.array((0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31))
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    if not (day <= month_days[month] + (leap & (month == 2))).all():
+        return None
+
+    days = _days_from_civil(year, month, day)
+    seconds = days * 86400 + hour * 3600 + minute * 60 + second
+    us = seconds * 1000000
+    if length > 20:
+        fraction = number(14, min(len(digits), 20))
+        us += fraction * 10 ** max(0, 20 - len(digits))
+    return us
+
+
+def parse_times(texts, use_numpy=True):
+    """Bulk parse of ISO-8601 timestamps (text of <time> in gpx) to seconds from the first one
+
+    The results are the same as (time - first_time).total_seconds() of the
+    parsed datetime; fractions beyond microseconds are truncated as
+    datetime.fromisoformat(), timestamps without offset are taken as UTC.
+
+    Args:
+        texts; a sequence of timestamps in str, e.g. '2023-05-01T00:00:00Z'.
+        use_numpy; parse the timestamps of the same fixed format at once by
+            numpy if available, else (or for the other formats) one by one by
+            datetime.fromisoformat().
+
+    Returns:
+        a float64 numpy array (with numpy) or array('d') of the seconds,
+        to be passed as times of reduce_points2dt().
+    """
+    if _use_numpy(use_numpy):
+        us = _times_np(texts) if len(texts) else None
+        if us is not None:
+            return (us - us[0]) / 1e6
+        return np.array(parse_times(texts, use_numpy=False))
+
+    times = [_parse_time(x) for x in texts]
+    return array('d', ((x - times[0]).total_seconds() for x in times))
+
+
+def _mean(column):
+    return sum(column) / len(column) if len(column) else 0.0
+
+
+def mercator_tolerance(pts, epsilon):
+    """Distance epsilon in meters to that in mercator() at the mean latitude of pts
+
+    A meter on the ground is sec(latitude) / A in the Mercator projection (sphere);
+    sec(latitude) = cosh(Mercator latitude).
+
+    Args:
+        pts; ProjectedPoints returned by mercator().
+        epsilon; distance in meters.
+    """
+    return epsilon / A * math.cosh(_mean(pts.columns[1]))
+
+
+def ecef_tolerance(pts, epsilon):
+    """Distance epsilon in meters to that in ecef(), i.e. as is."""
+    return epsilon
+
+
+def mercator_time_tolerance(pts, epsilon):
+    """Distance epsilon in meters to that in mercator_time() at the mean latitude of pts
+
+    Times are scaled by ave_speed / A without the factor of sec(latitude),
+    so the tolerance along the time axis is approximate.
+    """
+    return epsilon / A * math.cosh(_mean(pts.columns[0]))
+
+
+def mercator_trkpts(trkpts):
+    """mercator() of track points with attributes of latitude and longitude
+
+    The math module is used to keep the results of reduce_points2() unchanged.
+    """
+    return mercator(
+        [trkpt.latitude for trkpt in trkpts], 
+        [trkpt.longitude for trkpt in trkpts], 
+        use_numpy=False, 
+        )
+
+
+def ecef_trkpts(trkpts):
+    """ecef() of track points with attributes of latitude, longitude and elevation"""
+    return ecef(
+        [trkpt.latitude for trkpt in trkpts], 
+        [trkpt.longitude for trkpt in trkpts], 
+        [trkpt.elevation for trkpt in trkpts], 
+        use_numpy=False, 
+        )
+
+
+def mercator_time_trkpts(trkpts, ave_speed=5.556, times=None):
+    """mercator_time() of track points with attributes of latitude, longitude and time
+
+    Times (datetime) are converted to seconds from the first point, unless
+    times (seconds from the first point, e.g. by parse_times()) are given.
+    The math module is used to keep the results of reduce_points2dt() unchanged.
+    """
+    if times is None:
+        start_time = trkpts[0].time
+        times = [(trkpt.time - start_time).total_seconds() for trkpt in trkpts]
+    elif len(times) != len(trkpts):
+        raise ValueError('times should have the same length as trkpts')
+    return mercator_time(
+        [trkpt.latitude for trkpt in trkpts], 
+        [trkpt.longitude for trkpt in trkpts], 
+        times, 
+        ave_speed, 
+        use_numpy=False, 
+        )
+
+
+# Attributes of track points used in the modes, and projections of their columns.
+COLUMNS = {
+    '2d': ('latitude', 'longitude'),
+    '3d': ('latitude', 'longitude', 'elevation'),
+    '2dt': ('latitude', 'longitude', 'time'),
+    }
+PROJECTIONS = {
+    '2d': mercator,
+    '3d': ecef,
+    '2dt': mercator_time,
+    }
+
+
+def trkpt_columns(trkpts, mode):
+    """Columns (array('d')) of the attributes of track points used in the mode
+
+    Times are converted to seconds from the first point.
+    """
+    columns = []
+    for name in COLUMNS[mode]:
+        if name == 'time':
+            start_time = trkpts[0].time
+            column = array('d', (
+                (trkpt.time - start_time).total_seconds() for trkpt in trkpts))
+        else:
+            column = array('d', (getattr(trkpt, name) for trkpt in trkpts))
+        columns.append(column)
+    return columns
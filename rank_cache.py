@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# Persistent cache of the ranks of track points in Douglas-Peucker N.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# The ranks (order of insertion, see douglas_peucker_n.simplify_ranks()) of a
+# track are computed once and stored in a SQLite database, keyed by the hash
+# of the coordinates, the mode and the parameters of the projection.  Any
+# target number of points is then answered by a threshold over the ranks.
+# The database is bounded in size by evicting the least recently used tracks.
+
+from array import array
+import hashlib
+import sqlite3
+import time
+from projection import PROJECTIONS, ProjectedPoints, trkpt_columns
+from douglas_peucker_n import MODES, rank_points_n, select_ranks
+
+MAX_BYTES = 256 * 1024 * 1024
+
+
+class RankCache():
+    """Ranks of track points cached in a SQLite database
+
+    Args:
+        path; path of the database file (':memory:' for a temporary one).
+        max_bytes; upper limit of the total size of the cached ranks.
+
+    Usage:
+        with RankCache('ranks.sqlite3') as cache:
+            reduced_points = cache.reduce_points(trkpts, 2000, '2d')
+    """
+
+    def __init__(self, path='ranks.sqlite3', max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS ranks ('
+            'key TEXT PRIMARY KEY, typecode TEXT, ranks BLOB, '
+            'size INTEGER, last_used REAL)')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS ranks_last_used ON ranks (last_used)')
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def ranks(self, trkpts, mode='2d', **params):
+        """Ranks of the track points, from the cache or computed and cached.
+
+        Args:
+            trkpts; an iterable object containing track points,
+                or ProjectedPoints (already projected by the mode).
+            mode; '2d', '3d' or '2dt'
+            params; keyword arguments to the projection, e.g. ave_speed.
+
+        Returns:
+            ranks; array of integers (see douglas_peucker_n.simplify_ranks()).
+        """
+        if isinstance(trkpts, ProjectedPoints):
+            columns = trkpts.columns
+            key = track_key(columns, mode, {'projected': True})
+        else:
+            columns = trkpt_columns(trkpts, mode) if len(trkpts) else []
+            key = track_key(columns, mode, params)
+
+        row = self.connection.execute(
+            'SELECT typecode, ranks FROM ranks WHERE key = ?', (key, )).fetchone()
+        if row is not None:
+            self.hits += 1
+            self.connection.execute(
+                'UPDATE ranks SET last_used = ? WHERE key = ?', (time.time(), key))
+            self.connection.commit()
+            ranks = array(row[0])
+            ranks.frombytes(row[1])
+            return ranks
+
+        self.misses += 1
+        if isinstance(trkpts, ProjectedPoints):
+            pts = trkpts
+        elif columns:
+            pts = PROJECTIONS[mode](*columns, use_numpy=False, **params)
+        else:
+            pts = ProjectedPoints((array('d'), ))
+        ranks, _ = rank_points_n(pts, mode)
+        self._store(key, ranks)
+        return ranks
+
+    def reduce_points(self, trkpts, target_points, mode='2d', flags_out=False, **params):
+        """Reduce track points as reduce_points_n() by the cached ranks
+
+        The results are the same as reduce_points2(), reduce_points3d() or
+        reduce_points2dt() for mode '2d', '3d' or '2dt', respectively.
+
+        Returns:
+            a list of track points if flags_out is False; reduced_points
+            (indices of the reduced points if trkpts is ProjectedPoints)
+            else flags; a list of True/False flags
+        """
+        ranks = self.ranks(trkpts, mode, **params)
+        if flags_out:
+            return [rank >= target_points for rank in ranks]
+        elif isinstance(trkpts, ProjectedPoints):
+            return select_ranks(ranks, target_points)
+        else:
+            return [trkpts[i] for i in select_ranks(ranks, target_points)]
+
+    def _store(self, key, ranks):
+        data = ranks.tobytes()
+        if len(data) > self.max_bytes:
+            return
+        self.connection.execute(
+            'INSERT OR REPLACE INTO ranks VALUES (?, ?, ?, ?, ?)',
+            (key, ranks.typecode, data, len(data), time.time()))
+        self._evict()
+        self.connection.commit()
+
+    def _evict(self):
+        """Delete the least recently used ranks until the total size is within max_bytes."""
+        total = self.connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM ranks').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        keys = []
+        for key, size in self.connection.execute(
+                'SELECT key, size FROM ranks ORDER BY last_used'):
+            if total <= self.max_bytes:
+                break
+            keys.append((key, ))
+            total -= size
+        self.connection.executemany('DELETE FROM ranks WHERE key = ?', keys)
+
+
+def track_key(columns, mode, params):
+    """Hash of the columns (float64) with the mode and the parameters of the projection."""
+    if mode not in MODES:
+        raise ValueError(f'Unknown mode: {mode}')
+    h = hashlib.blake2b(digest_size=20)
+    h.update(repr((mode, sorted(params.items()), len(columns))).encode())
+    for column in columns:
+        h.update(len(column).to_bytes(8, 'little'))
+        h.update(memoryview(array('d', column) if not isinstance(column, array) else column))
+    return h.hexdigest()
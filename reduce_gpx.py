@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+#
+# Reduce track points of a gpx file by using Douglas-Peucker N algorithm.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# reduce_points() of reduce_points*.py; parse by gpxpy, reduce each
+# segment of the tracks in the mode (2d, 3d or 2dt) and write *_c.gpx.
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import sys
+import time
+import gpxpy
+import gpxpy.gpx
+from gpx_writer import save_gpx, write_gpx
+from projection import AVE_SPEED, PROJECTIONS, trkpt_columns
+from stats import phase
+from douglas_peucker_n import (
+    MODES, epsilon_threshold, radius_threshold, reduce_points_n, segment_budgets, simplify_segments)
+
+
+def reduce_gpx(gpxdocs, num_points=65535, mode='2d', write_file=True,
+        workers=None, budget='segment', epsilon=None, stats=None, radius=None, threads=None):
+    """Reduce track points in a gpx file and write it to *_c.gpx
+
+    Args:
+        gpxdocs; Path of the gpx file.
+        num_points; number of points in integer
+        mode; '2d', '3d' or '2dt'
+        write_file; write to *_c.gpx if True, else print.
+        workers (optional); reduce segments in parallel on a pool of processes.
+        budget; 'segment' for num_points in each segment,
+            'split' for num_points in total, distributed across segments,
+            'global' for num_points in total, selected by a queue shared among
+            all the segments (workers are not used).
+        epsilon (optional); error tolerance in meters.  Segments are reduced
+            until no removed point is farther than epsilon, within num_points.
+        stats (optional); stats.Stats to be filled in with the times of
+            'parse', 'projection', 'reduce' and 'serialize' and the counters
+            (not counted in the worker processes).
+        radius (optional); prefilter radius in meters, see douglas_peucker_n.prefilter().
+        threads (optional); search long spans of a segment in threads
+            (not with workers), see douglas_peucker_n.simplify_segments().
+    """
+    with gpxdocs.open('r') as gpx_file_r:
+        with phase(stats, 'parse'):
+            gpx = gpxpy.parse(gpx_file_r)
+
+        segments = [segment for track in gpx.tracks for segment in track.segments]
+
+        if budget == 'global':
+            reduce_segments_global(segments, num_points, mode, epsilon, stats, radius, threads)
+        elif workers:
+            targets = segment_budgets([len(x.points) for x in segments], num_points, budget)
+            with phase(stats, 'reduce'):
+                reduce_segments_parallel(segments, targets, mode, workers, epsilon, radius)
+        else:
+            targets = segment_budgets([len(x.points) for x in segments], num_points, budget)
+            for segment, target in zip(segments, targets):
+                trkpts = segment.points
+                trkpts_length = len(trkpts)
+                if target < trkpts_length or (epsilon is not None and trkpts_length > 2):
+                    start_time = time.time()
+                    segment.points = reduce_points_n(
+                        trkpts, target, mode, epsilon=epsilon, stats=stats, radius=radius, threads=threads, 
+                        **segment_params(segment, mode))
+                    print(f'Time: {time.time() - start_time} s')
+                print(f'Reduce trkpt: from {trkpts_length} to {len(segment.points)}')
+
+        out_file = Path(str(gpxdocs)[:-4] + '_c.gpx') if write_file else None
+        with phase(stats, 'serialize'):
+            finalize_gpx(gpx, out_file)
+
+
+def finalize_gpx(gpx, outfile_path=None):
+    """Output gpx xml to the outfile_path (or print if not specified).
+
+    The xml is streamed in chunks by gpx_writer.write_gpx() (UTF-8),
+    without building the whole document as a string.
+
+    Args:
+        gpx
+        outfile_path (optional): write gpx xml to the file or print (if None).
+    """
+    if outfile_path is not None:
+        save_gpx(gpx, outfile_path)
+    else:
+        sys.stdout.flush()
+        write_gpx(gpx, sys.stdout.buffer)
+        sys.stdout.buffer.write(b'\n')
+        sys.stdout.buffer.flush()
+
+
+def segment_params(segment, mode):
+    """Keyword arguments to the projection of the mode for the segment.
+
+    In 2dt, ave_speed is AVE_SPEED if the segment has no duration or no length.
+    """
+    if mode == '2dt':
+        duration = segment.get_duration()
+        speed = segment.length_2d() / duration if duration else 0.0
+        return {'ave_speed': speed if speed > 0 else AVE_SPEED}
+    return {}
+
+
+def segment_columns(segment, mode):
+    """Columns (array('d')) of the track points in a segment used in the mode.
+
+    Times are converted to seconds from the first point.
+    """
+    return trkpt_columns(segment.points, mode)
+
+
+def reduce_columns(columns, target_points, mode, params, epsilon=None, radius=None):
+    """Reduce a segment given by columns (run in a worker process).
+
+    Returns:
+        array of indices of the reduced points.
+    """
+    pts = PROJECTIONS[mode](*columns, use_numpy=False, **params)
+    return array('q', reduce_points_n(pts, target_points, mode, epsilon=epsilon, radius=radius))
+
+
+def reduce_segments_parallel(segments, targets, mode, workers=None, epsilon=None, radius=None):
+    """Reduce segments on a pool of processes, in the same order as reduce_gpx().
+
+    Only the columns used in the mode are sent to the workers, as arrays.
+    """
+    jobs = [(segment, target) for segment, target in zip(segments, targets)
+        if target < len(segment.points) or (epsilon is not None and len(segment.points) > 2)]
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            reduce_columns,
+            [segment_columns(x, mode) for x, _ in jobs],
+            [target for _, target in jobs],
+            [mode, ] * len(jobs),
+            [segment_params(x, mode) for x, _ in jobs],
+            [epsilon, ] * len(jobs),
+            [radius, ] * len(jobs),
+            )
+        for (segment, _), indices in zip(jobs, results):
+            trkpts = segment.points
+            segment.points = [trkpts[i] for i in indices]
+            print(f'Reduce trkpt: from {len(trkpts)} to {len(segment.points)}')
+    print(f'Time: {time.time() - start_time} s')
+
+
+def reduce_segments_global(segments, num_points, mode, epsilon=None, stats=None, radius=None, 
+        threads=None):
+    """Reduce segments to num_points in total with a queue shared among them."""
+    segments = [x for x in segments if x.points]
+    start_time = time.time()
+    project, metric = MODES[mode].projection, MODES[mode].metric
+    with phase(stats, 'projection'):
+        pts = [project(
+            x.points, **(segment_params(x, mode) if len(x.points) > 2 else {}))
+            for x in segments]
+    with phase(stats, 'reduce'):
+        flags = simplify_segments(pts, num_points, metric, 
+            tolerance=epsilon_threshold(MODES[mode], pts, epsilon), stats=stats, 
+            radius=radius_threshold(MODES[mode], pts, radius), timed=MODES[mode].timed, 
+            threads=threads)
+
+    for segment, seg_flags in zip(segments, flags):
+        trkpts = segment.points
+        segment.points = [trkpt for trkpt, flag in zip(trkpts, seg_flags) if not flag]
+        print(f'Reduce trkpt: from {len(trkpts)} to {len(segment.points)}')
+    print(f'Time: {time.time() - start_time} s')
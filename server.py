@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+#
+# A local HTTP server reducing track points by using Douglas-Peucker N algorithm.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# The reducers are imported once and kept warm in a pool of worker processes;
+# the asyncio event loop only reads the requests and writes the responses.
+#
+# POST /simplify?n=2000&mode=2d[&epsilon=5][&budget=segment]
+#     body; a gpx document, or json (Content-Type: application/json) of
+#         {"points": [[lat, lon(, ele or time)], ...]} (or the list itself).
+#         Times are in seconds or ISO-8601 strings.
+#     response; the reduced gpx document (by gpx_stream.reduce_gpx_data()), or
+#         json of {"indices": [...], "points": [...]} of the reduced points.
+# GET /health
+#     response; json of the numbers of jobs running, waiting and served.
+#
+# Backpressure; at most max_jobs requests are reduced at once, at most
+# max_waiting more wait for them, and the others are answered by 503 at once.
+# Responses are written in chunks, waiting for the client to drain each one.
+# Timing; Server-Timing header (wait, reduce and total in ms) and a log line
+# for each request.
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+from xml.parsers import expat
+
+CHUNK_SIZE = 1 << 16
+MAX_BYTES = 256 * 1024 * 1024
+MAX_HEADERS = 100
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+    503: 'Service Unavailable',
+    }
+
+
+def warm_up():
+    """Initializer of the worker processes; import the reducers and run them once."""
+    import gpx_stream
+    from douglas_peucker_n import EUCLIDEAN, simplify
+    from projection import mercator
+    simplify(mercator([0.0, 0.5, 1.0], [0.0, 1.0, 0.0]), 2, EUCLIDEAN)
+
+
+def reduce_gpx(data, num_points, mode='2d', budget='segment', epsilon=None):
+    """Reduce a gpx document in bytes (in a worker).
+
+    Returns:
+        (the reduced gpx document in bytes, (number of points, number of reduced points))
+    """
+    from gpx_stream import reduce_gpx_data
+    result, counts = reduce_gpx_data(data, num_points, mode, budget, epsilon)
+    return result, (sum(x for x, _ in counts), sum(y for _, y in counts))
+
+
+def reduce_coordinates(data, num_points, mode='2d', epsilon=None):
+    """Reduce coordinates in json (in a worker), see the header of this file.
+
+    Returns:
+        (json of the indices and the reduced points in bytes,
+        (number of points, number of reduced points))
+    """
+    from douglas_peucker_n import MODES, epsilon_threshold, simplify
+    from projection import COLUMNS, PROJECTIONS, parse_times
+
+    points = json.loads(data)
+    if isinstance(points, dict):
+        points = points['points']
+    names = COLUMNS[mode]
+    columns = [list(x) for x in zip(*(point[:len(names)] for point in points))]
+    if len(points) and len(columns) != len(names):
+        raise ValueError(f'Points should have {len(names)} values ({", ".join(names)}) in {mode}')
+
+    if not points:
+        indices = []
+    else:
+        params = {}
+        if mode == '2dt':
+            t = columns[2]
+            columns[2] = parse_times(t) if isinstance(t[0], str) else [x - t[0] for x in t]
+            params['ave_speed'] = 'auto'
+        pts = PROJECTIONS[mode](*columns, **params)
+        flags = simplify(pts, num_points, MODES[mode].metric,
+            tolerance=epsilon_threshold(MODES[mode], [pts, ], epsilon))
+        indices = [i for i, flag in enumerate(flags) if not flag]
+
+    result = json.dumps({'indices': indices, 'points': [points[i] for i in indices]})
+    return result.encode(), (len(points), len(indices))
+
+
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SimplifyServer():
+    """HTTP server dispatching the reductions to a warm pool of processes
+
+    Args:
+        workers; number of worker processes (os.cpu_count() if None).
+        max_jobs; number of requests reduced at once (workers if None).
+        max_waiting; number of requests waiting for max_jobs (4 * max_jobs if None).
+        max_bytes; upper limit of the size of a request body.
+    """
+
+    def __init__(self, workers=None, max_jobs=None, max_waiting=None, max_bytes=MAX_BYTES):
+        self.workers = workers or os.cpu_count()
+        self.max_jobs = max_jobs or self.workers
+        self.max_waiting = 4 * self.max_jobs if max_waiting is None else max_waiting
+        self.max_bytes = max_bytes
+        self.executor = None
+        self.slots = None
+        self.running = 0
+        self.waiting = 0
+        self.served = 0
+
+    async def serve(self, host='127.0.0.1', port=8000, unix=None):
+        """Start the pool and serve until cancelled."""
+        self.slots = asyncio.Semaphore(self.max_jobs)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up) as executor:
+            self.executor = executor
+            # Start the workers before the first request.
+            await asyncio.gather(*(
+                asyncio.get_running_loop().run_in_executor(executor, warm_up)
+                for _ in range(self.workers)))
+            if unix:
+                server = await asyncio.start_unix_server(self.handle, path=unix)
+            else:
+                server = await asyncio.start_server(self.handle, host, port)
+            print(f'Serving on {unix or f"http://{host}:{port}"} with {self.workers} workers.',
+                flush=True)
+            async with server:
+                await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        """Serve the requests of a connection (keep-alive)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                if not await self.handle_request(request_line, reader, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request_line, reader, writer):
+        """Serve a request; return True to keep the connection alive."""
+        start_time = time.perf_counter()
+        timing = {}
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            await self.respond(writer, 400, b'Malformed request line\n', close=True)
+            return False
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            if len(headers) >= MAX_HEADERS:
+                await self.respond(writer, 400, b'Too many headers\n', close=True)
+                return False
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = (version == 'HTTP/1.1') != (headers.get('connection', '').lower() == 'close')
+
+        url = urlsplit(target)
+        status, body, points, content_type = 200, b'', None, 'text/plain'
+        try:
+            if url.path == '/health':
+                if method != 'GET':
+                    raise BadRequest(405, 'GET only')
+                body = json.dumps({
+                    'workers': self.workers, 'running': self.running,
+                    'waiting': self.waiting, 'served': self.served}).encode()
+                content_type = 'application/json'
+            elif url.path == '/simplify':
+                if method != 'POST':
+                    raise BadRequest(405, 'POST only')
+                function, args, content_type = self.job(headers, parse_qs(url.query))
+                body, points = await self.dispatch(
+                    reader, writer, headers, function, args, timing)
+            else:
+                raise BadRequest(404, f'No such path: {url.path}')
+        except BadRequest as e:
+            status, body = e.status, f'{e}\n'.encode()
+        except (ValueError, KeyError, TypeError, IndexError, expat.ExpatError) as e:
+            status, body = 400, f'{type(e).__name__}: {e}\n'.encode()
+        except Exception as e:
+            status, body = 500, f'{type(e).__name__}: {e}\n'.encode()
+
+        # The connection is closed if the request body is left unread, or if it is
+        # chunked (Transfer-Encoding), which is not framed by Content-Length.
+        keep_alive = keep_alive and 'transfer-encoding' not in headers and (
+            'read' in timing or headers.get('content-length', '0') == '0')
+        timing['total'] = time.perf_counter() - start_time
+        extra = {'Server-Timing': ', '.join(f'{k};dur={v * 1000:.1f}' for k, v in timing.items())}
+        if points is not None:
+            extra['X-Points'] = f'{points[0]} -> {points[1]}'
+        await self.respond(writer, status, body, content_type, extra, close=not keep_alive)
+        print(f'{method} {target} {status} {len(body)} B'
+            + (f' {points[0]} -> {points[1]} points' if points else '')
+            + ''.join(f' {k} {v * 1000:.1f} ms' for k, v in timing.items()), flush=True)
+        return keep_alive
+
+    async def read_body(self, reader, writer, headers):
+        if 'content-length' not in headers:
+            raise BadRequest(411, 'Content-Length is required')
+        length = int(headers['content-length'])
+        if length > self.max_bytes:
+            raise BadRequest(413, f'Request body larger than {self.max_bytes} bytes')
+        if headers.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            await writer.drain()
+        return await reader.readexactly(length)
+
+    def job(self, headers, query):
+        """The function for a worker with the arguments but the request body,
+        and the content type of the result."""
+        def param(name, convert, default=None):
+            values = query.get(name)
+            return convert(values[-1]) if values else default
+
+        mode = param('mode', str, '2d')
+        if mode not in ('2d', '3d', '2dt'):
+            raise BadRequest(400, f'Unknown mode: {mode}')
+        epsilon = param('epsilon', float)
+        num_points = param('n', int, 65535 if epsilon is None else None)
+        if 'json' in headers.get('content-type', ''):
+            return reduce_coordinates, (num_points, mode, epsilon), 'application/json'
+        if num_points is None:
+            num_points = 65535
+        budget = param('budget', str, 'segment')
+        if budget not in ('segment', 'split', 'global'):
+            raise BadRequest(400, f'Unknown budget: {budget}')
+        return reduce_gpx, (num_points, mode, budget, epsilon), 'application/gpx+xml'
+
+    async def dispatch(self, reader, writer, headers, function, args, timing):
+        """Run function(request body, *args) in the pool within max_jobs and max_waiting.
+
+        Requests over max_waiting are refused before their bodies are read.
+        """
+        if self.running + self.waiting >= self.max_jobs + self.max_waiting:
+            raise BadRequest(503, 'Too many requests, retry later')
+        start_time = time.perf_counter()
+        self.waiting += 1
+        try:
+            data = await self.read_body(reader, writer, headers)
+            timing['read'] = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            self.running += 1
+            timing['wait'] = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, function, data, *args)
+            timing['reduce'] = time.perf_counter() - start_time
+            self.served += 1
+            return result
+        finally:
+            self.running -= 1
+            self.slots.release()
+
+    async def respond(self, writer, status, body, content_type='text/plain', extra=None,
+            close=False):
+        """Write the response in chunks of CHUNK_SIZE, draining each one."""
+        headers = {
+            'Content-Type': content_type,
+            'Content-Length': str(len(body)),
+            'Connection': 'close' if close else 'keep-alive',
+            }
+        if status == 503:
+            headers['Retry-After'] = '1'
+        headers.update(extra or {})
+        writer.write(
+            f'HTTP/1.1 {status} {REASONS[status]}\r\n'.encode()
+            + ''.join(f'{k}: {v}\r\n' for k, v in headers.items()).encode() + b'\r\n')
+        view = memoryview(body)
+        for i in range(0, len(view), CHUNK_SIZE):
+            writer.write(view[i:i + CHUNK_SIZE])
+            await writer.drain()
+        await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve Douglas-Peucker N reduction of gpx/coordinates over HTTP.')
+    parser.add_argument('-H', '--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=8000)
+    parser.add_argument('-u', '--unix', default=None, help='path of a unix socket instead of host/port')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('-j', '--max-jobs', type=int, default=None,
+        help='requests reduced at once (default: workers)')
+    parser.add_argument('-q', '--max-waiting', type=int, default=None,
+        help='requests waiting for a job before 503 (default: 4 * max-jobs)')
+    parser.add_argument('--max-bytes', type=int, default=MAX_BYTES)
+    args = parser.parse_args(argv)
+
+    server = SimplifyServer(args.workers, args.max_jobs, args.max_waiting, args.max_bytes)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+#
+# Build the optional compiled accelerator of douglas_peucker_n.py by Cython.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# Usage: # python setup_accel.py build_ext --inplace
+#
+# douglas_peucker_n.py (with the type declarations in douglas_peucker_n.pxd)
+# is compiled as it is into the extension module _douglas_peucker_n_accel,
+# which replaces the public names of douglas_peucker_n when it is importable.
+# Remove the extension (or set DPN_PURE_PYTHON=1) to use the pure python code.
+
+from pathlib import Path
+import shutil
+from setuptools import Extension, setup
+from Cython.Build import cythonize
+
+HERE = Path(__file__).resolve().parent
+BUILD = HERE / 'build'
+NAME = '_douglas_peucker_n_accel'
+
+BUILD.mkdir(exist_ok=True)
+for suffix in ('.py', '.pxd'):
+    shutil.copyfile(HERE / f'douglas_peucker_n{suffix}', BUILD / f'{NAME}{suffix}')
+
+setup(
+    name=NAME,
+    ext_modules=cythonize(
+        [Extension(NAME, [str(BUILD / f'{NAME}.py')])],
+        build_dir=str(BUILD),
+        compiler_directives={'language_level': 3},
+        ),
+    )
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Optional statistics of the Douglas-Peucker N reducers.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# Pass a Stats object as stats= to the reducers (reduce_points*(), reduce_gpx(),
+# reduce_gpx_stream()) to collect the wall times of the phases and the counters
+# of the hot paths.  With stats=None (default) the reducers run as before; the
+# counters are collected by wrappers of the queue and of the farthest point
+# search, which are used only if stats is given.
+
+from contextlib import contextmanager, nullcontext
+import time
+
+
+class Stats():
+    """Wall times of the phases and counters filled in by the reducers
+
+    times; a dict of the wall times in s of the phases, e.g.
+        'parse', 'projection', 'reduce' and 'serialize', and of the searches
+        of the farthest point ('search') and the queue operations ('queue')
+        in 'reduce'.
+    distance_evaluations; number of the distances evaluated by the searches;
+        the bounded searches with numpy count the bounds of the blocks and
+        the points scanned, not the skipped ones.
+    searches; number of the searches of the farthest point.
+    pushes, pops; numbers of enqueue/dequeue of the priority queue.
+    max_queue_size; the largest number of spans in the queue.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self.distance_evaluations = 0
+        self.searches = 0
+        self.pushes = 0
+        self.pops = 0
+        self.max_queue_size = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Add the wall time of the with block to times[name]."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start_time)
+
+    def counting_find(self, find):
+        """Wrap a farthest point search, e.g. find_farthest(), to count and time the searches.
+
+        The search counts its distance evaluations into this by stats=.
+        """
+        def counted(pts, start, end, metric):
+            self.searches += 1
+            start_time = time.perf_counter()
+            try:
+                return find(pts, start, end, metric, stats=self)
+            finally:
+                self.add_time('search', time.perf_counter() - start_time)
+        return counted
+
+    def add_time(self, name, seconds):
+        """Add seconds to times[name]."""
+        self.times[name] = self.times.get(name, 0.0) + seconds
+
+    def counting_queue(self, queue):
+        """Wrap a priority queue to count and time the pushes and pops."""
+        return CountingQueue(queue, self)
+
+    def as_dict(self):
+        return {
+            'times': dict(self.times),
+            'distance_evaluations': self.distance_evaluations,
+            'searches': self.searches,
+            'pushes': self.pushes,
+            'pops': self.pops,
+            'max_queue_size': self.max_queue_size,
+            }
+
+    def __repr__(self):
+        return f'Stats({self.as_dict()})'
+
+
+class CountingQueue():
+    """A priority queue counting the pushes and pops into Stats"""
+
+    def __init__(self, queue, stats):
+        self.queue = queue
+        self.stats = stats
+        self.name = queue.name
+
+    def enqueue(self, priority, value):
+        start_time = time.perf_counter()
+        self.queue.enqueue(priority, value)
+        self.stats.add_time('queue', time.perf_counter() - start_time)
+        self.stats.pushes += 1
+        self.stats.max_queue_size = max(self.stats.max_queue_size, self.queue.size())
+
+    def dequeue(self):
+        self.stats.pops += 1
+        start_time = time.perf_counter()
+        try:
+            return self.queue.dequeue()
+        finally:
+            self.stats.add_time('queue', time.perf_counter() - start_time)
+
+    def size(self):
+        return self.queue.size()
+
+
+def phase(stats, name):
+    """stats.phase(name), or a context doing nothing if stats is None."""
+    return nullcontext() if stats is None else stats.phase(name)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+#
+# Columnar archive of track points for bulk simplification.
+# https://github.com/ekspla/Douglas-Peucker_N
+#
+# Tracks (trksegs) of many gpx files are parsed once and stored in a binary
+# file of concatenated float64 columns (latitude, longitude, elevation, time)
+# with an index of the offsets of each track.  The archive is read by mmap;
+# the columns of a track are views of the file (numpy arrays if available,
+# memoryviews otherwise) given to the projections without copying, so that the
+# tracks can be reduced again (e.g. for another number of points or mode)
+# without touching xml.  The results are the indices of the kept points.
+#
+# Layout (little endian):
+#     header; MAGIC, number of tracks, number of points, offset of the names
+#     offsets; int64 x (number of tracks + 1), the first point of each track
+#     columns; float64 x number of points, for each of ARCHIVE_COLUMNS
+#     names; the names of the tracks in json (utf-8)
+
+from array import array
+import argparse
+import json
+import math
+import mmap
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from projection import COLUMNS
+from gpx_stream import read_segments, reduce_columns
+
+MAGIC = b'DPNTRK01'
+INDEX_MAGIC = b'DPNIDX01'
+HEADER = struct.Struct('<8sQQQ')
+# Times are in seconds (POSIX time), NaN if missing; elevations are 0.0 if missing.
+ARCHIVE_COLUMNS = ('latitude', 'longitude', 'elevation', 'time')
+CHUNK_SIZE = 1 << 20
+
+if sys.byteorder != 'little':
+    raise ImportError('track_archive requires a little endian machine')
+
+
+class ArchiveWriter():
+    """Write tracks to an archive file
+
+    The columns are spooled to temporary files and joined on close(), so that
+    the memory use is bounded by a track instead of the archive.
+
+    Usage:
+        with ArchiveWriter('tracks.dpn') as writer:
+            writer.add(columns, 'name')
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.names = []
+        self.offsets = array('q', [0])
+        self.spools = {name: tempfile.TemporaryFile() for name in ARCHIVE_COLUMNS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def add(self, columns, name=''):
+        """Append a track
+
+        Args:
+            columns; a dict of the columns (sequences of float) with keys of
+                ARCHIVE_COLUMNS; elevation and time may be omitted.
+            name; name of the track.
+        """
+        length = len(columns['latitude'])
+        for key, spool in self.spools.items():
+            column = columns.get(key)
+            if column is None:
+                column = [0.0 if key == 'elevation' else float('nan')] * length
+            elif len(column) != length:
+                raise ValueError(f'{key} should have the same length as latitude')
+            if np is not None and not isinstance(column, array):
+                column = np.ascontiguousarray(column, dtype=np.float64)
+            elif not isinstance(column, array) or column.typecode != 'd':
+                column = array('d', column)
+            spool.write(memoryview(column).cast('B'))
+        self.offsets.append(self.offsets[-1] + length)
+        self.names.append(name)
+
+    def add_gpx(self, gpxdocs):
+        """Append the trksegs of a gpx file (Path), named as 'path#index'
+
+        Returns:
+            number of the tracks added.
+        """
+        segments = read_segments(gpxdocs, names=ARCHIVE_COLUMNS)
+        for i, segment in enumerate(segments):
+            self.add(segment.columns, f'{gpxdocs}#{i}')
+        return len(segments)
+
+    def close(self):
+        if self.spools is None:
+            return
+        num_tracks = len(self.names)
+        num_points = self.offsets[-1]
+        names_offset = HEADER.size + 8 * (num_tracks + 1) + 8 * num_points * len(ARCHIVE_COLUMNS)
+        with self.path.open('wb') as f:
+            f.write(HEADER.pack(MAGIC, num_tracks, num_points, names_offset))
+            f.write(self.offsets)
+            for spool in self.spools.values():
+                spool.seek(0)
+                shutil.copyfileobj(spool, f, CHUNK_SIZE)
+            f.write(json.dumps(self.names).encode())
+        self._discard()
+
+    def _discard(self):
+        if self.spools is not None:
+            for spool in self.spools.values():
+                spool.close()
+            self.spools = None
+
+
+class TrackArchive():
+    """Tracks in an archive file, mapped read-only by mmap
+
+    The columns returned by track() are views of the mapping; they should be
+    dropped before close().
+
+    Args:
+        path; path of the archive file.
+        use_numpy; return the columns as numpy arrays if available.
+
+    Usage:
+        with TrackArchive('tracks.dpn') as archive:
+            kept = archive.simplify(0, 2000, '2d')
+    """
+
+    def __init__(self, path, use_numpy=True):
+        self.use_numpy = use_numpy and np is not None
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.num_tracks, self.num_points, names_offset = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a track archive')
+        start = HEADER.size
+        self.offsets = memoryview(self._mmap)[start:start + 8 * (self.num_tracks + 1)].cast('q')
+        start += 8 * (self.num_tracks + 1)
+        self._starts = {}
+        for name in ARCHIVE_COLUMNS:
+            self._starts[name] = start
+            start += 8 * self.num_points
+        self.names = json.loads(self._mmap[names_offset:].decode())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.num_tracks
+
+    def close(self):
+        if self._mmap.closed:
+            return
+        self.offsets.release()
+        self._mmap.close()
+
+    def track(self, index, names=ARCHIVE_COLUMNS):
+        """Columns of a track without copying
+
+        Returns:
+            a dict of the columns with keys of names; float64 numpy arrays,
+            or memoryviews of format 'd' if use_numpy is False.
+        """
+        start, end = self.offsets[index], self.offsets[index + 1]
+        columns = {}
+        for name in names:
+            offset = self._starts[name] + 8 * start
+            if self.use_numpy:
+                columns[name] = np.frombuffer(self._mmap, np.float64, end - start, offset)
+            else:
+                with memoryview(self._mmap) as view:
+                    columns[name] = view[offset:offset + 8 * (end - start)].cast('d')
+        return columns
+
+    def reduce(self, indices, num_points, mode='2d', budget='segment', epsilon=None,
+            stats=None):
+        """Reduce tracks in the archive
+
+        Args:
+            indices; indices of the tracks.
+            num_points; number of points in integer
+            mode; '2d', '3d' or '2dt'
+            budget; 'segment', 'split' or 'global' (see reduce_gpx.reduce_gpx()),
+                the tracks are counted as segments.
+            epsilon (optional); error tolerance in meters.
+            stats (optional); stats.Stats to be filled in.
+
+        Returns:
+            a list of the indices of the kept points (array('q')) for each track.
+        """
+        tracks = [self.track(i, COLUMNS[mode]) for i in indices]
+        if mode == '2dt':
+            for i, columns in zip(indices, tracks):
+                if _has_nan(columns['time']):
+                    raise ValueError(f'A point without time in {self.names[i]}')
+        flags = reduce_columns(tracks, num_points, mode, budget, epsilon, stats)
+        return [kept_indices(x) for x in flags]
+
+    def simplify(self, index, num_points, mode='2d', epsilon=None, stats=None):
+        """Reduce a track in the archive, see reduce()
+
+        Returns:
+            the indices of the kept points (array('q')).
+        """
+        return self.reduce([index], num_points, mode, epsilon=epsilon, stats=stats)[0]
+
+
+def _has_nan(column):
+    if np is not None:
+        return bool(np.isnan(np.asarray(column)).any())
+    return any(map(math.isnan, column))
+
+
+def kept_indices(flags):
+    """Indices of the points not removed (flags of False) in array('q')."""
+    return array('q', (i for i, flag in enumerate(flags) if not flag))
+
+
+def build_archive(path, files):
+    """Write the trksegs of gpx files (Paths) to an archive.
+
+    Returns:
+        number of the tracks.
+    """
+    with ArchiveWriter(path) as writer:
+        for gpxdocs in files:
+            writer.add_gpx(gpxdocs)
+    return len(writer.names)
+
+
+def save_indices(path, kept):
+    """Write the indices of the kept points of tracks (e.g. by TrackArchive.reduce()) to a file
+
+    The layout is that of the archive with a column of int64 indices and without names.
+    """
+    offsets = array('q', [0])
+    for x in kept:
+        offsets.append(offsets[-1] + len(x))
+    with Path(path).open('wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, len(kept), offsets[-1], 0))
+        f.write(offsets)
+        for x in kept:
+            f.write(array('q', x))
+
+
+def load_indices(path):
+    """Read the indices of the kept points of tracks written by save_indices().
+
+    Returns:
+        a list of array('q') for each track.
+    """
+    data = Path(path).read_bytes()
+    magic, num_tracks, num_points, _ = HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC:
+        raise ValueError(f'{path} is not an index file')
+    start = HEADER.size + 8 * (num_tracks + 1)
+    offsets = memoryview(data)[HEADER.size:start].cast('q')
+    indices = memoryview(data)[start:start + 8 * num_points].cast('q')
+    return [array('q', indices[offsets[i]:offsets[i + 1]]) for i in range(num_tracks)]
+
+
+def main(argv=None):
+    from batch_reduce import find_gpx_files
+
+    parser = argparse.ArgumentParser(
+        description='Build an archive of gpx tracks, or reduce the tracks in it.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='write the trksegs of gpx files to an archive')
+    build.add_argument('archive')
+    build.add_argument('input', help='a directory or a glob pattern of gpx files')
+    reduce = commands.add_parser('reduce', help='reduce all tracks in an archive')
+    reduce.add_argument('archive')
+    reduce.add_argument('number_of_points', type=int, nargs='?', default=2000)
+    reduce.add_argument('-m', '--mode', choices=sorted(COLUMNS), default='2d')
+    reduce.add_argument('-b', '--budget', choices=('segment', 'split', 'global'), default='segment')
+    reduce.add_argument('-e', '--epsilon', type=float, default=None,
+        help='error tolerance in meters (number_of_points is the upper limit)')
+    reduce.add_argument('-o', '--output', help='file of the indices of the kept points')
+    args = parser.parse_args(argv)
+
+    start_time = time.perf_counter()
+    if args.command == 'build':
+        files = find_gpx_files(args.input)
+        if not files:
+            print(f'Error: no gpx files in {args.input}.')
+            return 1
+        num_tracks = build_archive(args.archive, files)
+        print(f'Archived {num_tracks} tracks of {len(files)} files '
+            f'in {time.perf_counter() - start_time:.3f} s.')
+        return 0
+
+    with TrackArchive(args.archive) as archive:
+        kept = archive.reduce(
+            range(len(archive)), args.number_of_points, args.mode, args.budget, args.epsilon)
+        for name, start, end, x in zip(
+                archive.names, archive.offsets, archive.offsets[1:], kept):
+            print(f'{name}: from {end - start} to {len(x)}')
+    if args.output:
+        save_indices(args.output, kept)
+    print(f'Reduced {len(kept)} tracks in {time.perf_counter() - start_time:.3f} s.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())